@@ -1,6 +1,24 @@
-import raylibpy as rl
+import argparse
+import bisect
+import csv
+import itertools
+import io
+import json
+import os
+import platform
 import random
+import struct
+import sys
 import math
+import multiprocessing
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 
 # Define constants
 SCREEN_WIDTH = 1600
@@ -8,108 +26,816 @@ SCREEN_HEIGHT = 900
 SUNNY = 1
 CLOUDY = 2
 RAINY = 3
-RAINDROP_COUNT = 100
-DESERT_COLOR = rl.Color(237, 201, 175, 255)
-GRASSLAND_COLOR = rl.Color(124, 252, 0, 255)
-FOREST_COLOR = rl.Color(34, 139, 34, 255)
-TUNDRA_COLOR = rl.Color(200, 220, 240, 255)
-MAX_PLANTS = 100
+PARTICLE_COUNT = 20000  # Rain and snow particles kept over the view
+CLEAR, RAIN, SNOW = 0, 1, 2  # Precipitation kinds
+HAPPY, SAD, ANGRY, FEARFUL = 0, 1, 2, 3  # Human emotions
+PRECIPITATION = {"clear": CLEAR, "rain": RAIN, "snow": SNOW}  # From Zone.get_weather
+SNOW_TEMPERATURE = 5  # Zones never warmer than this snow instead of raining in a storm
+SNOW_SPEED = 0.3  # Snowflakes fall at this fraction of a raindrop's speed, drifting sideways
+DESERT_COLOR = (237, 201, 175, 255)
+GRASSLAND_COLOR = (124, 252, 0, 255)
+FOREST_COLOR = (34, 139, 34, 255)
+TUNDRA_COLOR = (200, 220, 240, 255)
+RAINDROP_COLOR = (0, 121, 241, 255)  # raylib BLUE
+SNOW_COLOR = (245, 245, 255, 255)
+PLANT_COLOR = (0, 228, 48, 255)  # raylib GREEN
+MAX_PLANTS = 100  # Most cells one plant can cover
+BIOMASS_MAX = 10  # Biomass of a fully grown vegetation cell
+GRAZE_BITE = 2  # Biomass one bite takes out of a cell
+FOOD_BUCKET_CELLS = 2  # Map cells per side of a FoodIndex bucket
+FERTILE_ZONES = ("Grassland", "Forest")  # Zones where plants grow
+CLIMATE_INTERVAL = 60  # Ticks between fresh per-cell temperature and humidity draws
+CLIMATE_MEAN_TEMPERATURE = 20  # Cells warmer than this get more sunlight than the global level
+WEATHER_CLIMATE = {SUNNY: (5, -10), CLOUDY: (-5, 5), RAINY: (-10, 20)}  # (temperature, humidity) shifts
+GRID_CELL_SIZE = 40  # Spatial hash cell size, covers the 20-70 px interaction radii in one or two rings
+LINEAR_SCAN_LIMIT = 256  # Below this many rows one array scan beats walking grid rings
+CHUNK_SIZE = 64  # Cells per side of a chunk in the infinite world
+CHUNK_MEMORY_CAP = 64 * 1024 * 1024  # Bytes of generated zone chunks kept in memory
+CHUNK_REFRESH_INTERVAL = 30  # Ticks between parking/restoring entities of inactive chunks
+ACTIVE_CHUNK_RADIUS = 2  # Chunks around the focus point that keep simulating
+PROFILE_WINDOW = 300  # Ticks of history the profiler keeps for its rolling percentiles
+STATS_HISTORY = 3600  # Ticks of population statistics kept in memory
+STATS_BLOCK = 256  # Ticks per block when streaming statistics to a file
+STATS_GRAPH_TICKS = 600  # Ticks the in-game population graph spans
+RNG_BATCH = 1024  # Uniforms a RandomStream draws from NumPy at once for its scalar calls
+TILE_CELLS = 25  # Map cells per side of a tile the threat fields are built in
+THREAT_RANGE = 70  # Widest flee radius (birds); the threat fields reach this far around a cell
+EVENT_KEYFRAME_INTERVAL = 10  # Ticks between full-position keyframes in an event log
+LOD_IDLE_PERIOD = 4  # Ticks between full updates of idle entities on screen
+LOD_MAX_PERIOD = 16  # Longest gap between full updates of idle entities far off screen
+LOD_MARGIN = 20  # Pixels beyond an interaction radius, or the view, that still count as close
+
+rl = None  # raylibpy, only imported by the interactive front end
+
+def load_raylib():
+    global rl
+    if rl is None:
+        import raylibpy
+        rl = raylibpy
+    return rl
+
+STORE_COLUMNS = ("x", "y", "speed", "direction", "hunger", "health", "bravery", "size",
+                 "reproduction_range", "has_reproduced")
+
+class Column:
+    # Animal attribute that lives in a row of its EntityStore once the animal is attached
+    def __set_name__(self, owner, name):
+        self.name = name
 
-import random
+    def __get__(self, entity, owner=None):
+        if entity is None:
+            return self
+        store = entity._store
+        if store is None:
+            return entity._detached[self.name]
+        return store.columns[self.name].item(entity._row)
+
+    def __set__(self, entity, value):
+        store = entity._store
+        if store is None:
+            entity._detached[self.name] = value
+        else:
+            store.columns[self.name][entity._row] = value
+
+class RandomStream:
+    # One independent generator with the scalar methods of the random module that the
+    # simulation uses. Scalars come from a batch of NumPy uniforms handed out one at a time;
+    # vectorized code draws whole arrays from .generator.
+    def __init__(self, seed_sequence):
+        self.generator = np.random.Generator(np.random.PCG64(seed_sequence))
+        self.batch = []
+        self.position = 0
+
+    def random(self):
+        if self.position == len(self.batch):
+            self.batch = self.generator.random(RNG_BATCH).tolist()
+            self.position = 0
+        value = self.batch[self.position]
+        self.position += 1
+        return value
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def sample(self, population, k):
+        # Partial Fisher-Yates shuffle
+        pool = list(population)
+        for i in range(k):
+            j = i + int(self.random() * (len(pool) - i))
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+    def getstate(self):
+        return self.generator.bit_generator.state, self.batch[self.position:]
+
+    def setstate(self, state):
+        self.generator.bit_generator.state, batch = state
+        self.batch, self.position = list(batch), 0
+
+class RngService:
+    # The random streams of one simulation: one per subsystem, optionally keyed by integers
+    # (a chunk, an entity). Each stream is seeded from the run seed and its key alone, so
+    # draws in one subsystem never shift another's and a seed always replays bit for bit.
+    # The simulation only needs one stream per subsystem: entities draw in the update loops,
+    # which run in one process over lists in a fixed order, and the tile kernels draw nothing.
+    # Chunk zones and the climate fields never use a stream; they hash the seed with the cell,
+    # so they come out the same whichever chunks are visited and in what order. A stream per
+    # entity would cost a generator per animal for no change in reproducibility.
+    def __init__(self, seed=None):
+        self.seed = np.random.SeedSequence(seed).entropy  # Drawn fresh when seed is None
+        self.streams = {}
+
+    def stream(self, name, *keys):
+        key = (name,) + keys
+        stream = self.streams.get(key)
+        if stream is None:
+            spawn_key = (zlib.crc32(name.encode()),) + tuple(k & 0xFFFFFFFFFFFFFFFF for k in keys)
+            stream = RandomStream(np.random.SeedSequence(self.seed, spawn_key=spawn_key))
+            self.streams[key] = stream
+        return stream
+
+POOL_LIMIT = 4096  # Dead instances kept per EntityList for births to reuse
+
+class EntityRegistry:
+    # Hands out stable ids and finds live entities by id across every EntityList
+    def __init__(self):
+        self.next_id = 1
+        self.entities = {}
+
+    def register(self, entity):
+        if entity.id is None:
+            entity.id = self.next_id
+            self.next_id += 1
+        self.entities[entity.id] = entity
+
+    def forget(self, entity):
+        self.entities.pop(entity.id, None)
+
+    def get(self, entity_id):
+        return self.entities.get(entity_id)
+
+class EntityList:
+    # Live entities of one kind. Deaths are queued with kill() and compacted once per tick by
+    # flush() using swap-removes, so nothing shifts while the simulation iterates, and the
+    # dead instances are pooled for spawn() to reuse on the next birth.
+    def __init__(self, kind, registry=None, rng=random):
+        self.kind = kind
+        self.registry = registry if registry is not None else EntityRegistry()
+        self.rng = rng  # Random stream the entities of this list draw from
+        self.events = None  # EventLog recording births and deaths, if any
+        self.births = 0  # Tallies since the PopulationStats last read them
+        self.deaths = [0, 0]  # (no killer: starved or withered, killed: hunted or grazed)
+        self.hunt_hunger = getattr(kind, "HUNT_HUNGER", None)  # This world's value, see TUNABLES
+        self.entities = []
+        self.dying = []
+        self.pool = []
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __iter__(self):
+        return iter(self.entities)
+
+    def __getitem__(self, index):
+        return self.entities[index]
+
+    def __contains__(self, entity):
+        return entity._store is self
+
+    def append(self, entity):
+        entity._store, entity._row, entity.alive = self, len(self.entities), True
+        entity.rng = self.rng
+        self.entities.append(entity)
+        self.registry.register(entity)
+        if self.events is not None:
+            self.events.spawn(entity)
+
+    def remove(self, entity):
+        # Immediate swap-remove; during a tick use kill() instead
+        if entity._store is not self:
+            raise ValueError("entity is not in this list")
+        row, last = entity._row, len(self.entities) - 1
+        if row != last:
+            moved = self.entities[last]
+            self.entities[row] = moved
+            moved._row = row
+            self.move_row(last, row)
+        self.entities.pop()
+        if self.events is not None and entity.alive:
+            self.events.kill(entity)  # Leaving without dying, e.g. parked with its chunk
+        entity._store, entity._row = None, -1
+        self.registry.forget(entity)
+
+    def move_row(self, source, target):
+        pass  # Hook for subclasses that keep per-row data
+
+    def kill(self, entity, killer=None):
+        if entity.alive:
+            entity.alive = False
+            self.dying.append(entity)
+            self.deaths[killer is not None] += 1
+            if self.events is not None:
+                self.events.kill(entity, killer)
+
+    def living(self):
+        # Per row, whether its entity is still alive, i.e. not killed since the last flush
+        alive = np.ones(len(self.entities), dtype=bool)
+        alive[[entity._row for entity in self.dying if entity._store is self]] = False
+        return alive
+
+    def flush(self):
+        for entity in self.dying:
+            if entity._store is self:
+                self.remove(entity)
+                if len(self.pool) < POOL_LIMIT:
+                    self.pool.append(entity)
+        self.dying.clear()
+
+    def spawn(self, *args):
+        # Birth, reusing a pooled dead instance when there is one
+        if self.pool:
+            entity = self.pool.pop()
+            entity.__init__(*args, rng=self.rng)
+        else:
+            entity = self.kind(*args, rng=self.rng)
+        self.append(entity)
+        return entity
+
+class EntityStore(EntityList):
+    # Struct-of-arrays storage for one species; the Animal objects are views onto its rows
+    def __init__(self, kind, capacity=64, rng=None, bounds=(SCREEN_WIDTH, SCREEN_HEIGHT), registry=None):
+        super().__init__(kind, registry, rng if rng is not None else RandomStream(np.random.SeedSequence()))
+        self.bounds = bounds  # (width, height) the animals bounce inside, None when unbounded
+        self.columns = {name: np.zeros(capacity) for name in STORE_COLUMNS}
+        self.lag = np.zeros(capacity)  # Ticks each row has gone unmoved, for the LOD scheduler
+
+    def column(self, name):
+        return self.columns[name][:len(self.entities)]
+
+    def reserve(self, rows):
+        # Grow the columns by doubling until they hold at least rows entries
+        capacity = len(self.columns["x"])
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        for name in STORE_COLUMNS:
+            grown = np.zeros(capacity)
+            grown[:len(self.columns[name])] = self.columns[name]
+            self.columns[name] = grown
+        grown = np.zeros(capacity)
+        grown[:len(self.lag)] = self.lag
+        self.lag = grown
+
+    def append(self, entity):
+        row = len(self.entities)
+        self.reserve(row + 1)
+        for name in STORE_COLUMNS:
+            self.columns[name][row] = entity._detached[name]
+        self.lag[row] = 0
+        entity._detached = None
+        super().append(entity)
+
+    def remove(self, entity):
+        if entity._store is not self:
+            raise ValueError("entity is not in this store")
+        detached = {name: self.columns[name].item(entity._row) for name in STORE_COLUMNS}
+        super().remove(entity)
+        entity._detached = detached
+
+    def move_row(self, source, target):
+        # Swap the last row into the hole so the columns stay dense
+        for name in STORE_COLUMNS:
+            self.columns[name][target] = self.columns[name][source]
+        self.lag[target] = self.lag[source]
+
+    def pack(self):
+        # Same arrays as pack_animals, but the store columns are copied whole
+        arrays = {name: self.column(name).copy() for name in STORE_COLUMNS}
+        for name in self.kind.SAVED_FIELDS:
+            arrays[name] = np.array([getattr(entity, name) for entity in self.entities])
+        return arrays
+
+    def restore(self, arrays):
+        # Bulk append of packed animals: the columns are copied in one go and only the
+        # Animal views are built row by row
+        kind, start, count = self.kind, len(self.entities), len(arrays["x"])
+        self.reserve(start + count)
+        for name in STORE_COLUMNS:
+            self.columns[name][start:start + count] = arrays[name]
+        self.lag[start:start + count] = 0
+        fields = {name: arrays[name].tolist() for name in kind.SAVED_FIELDS}
+        for i in range(count):
+            animal = kind.__new__(kind)
+            animal._detached = None
+            for name, values in fields.items():
+                setattr(animal, name, values[i])
+            EntityList.append(self, animal)
+
+    def move(self, mask=None, bravery_scaled=True, turn_chance=0.02, fearful_turn_chance=0.05, hunger_decay=0.05,
+             steps=None):
+        # Vectorized Animal.move over every row (or the rows selected by mask) in one pass.
+        # steps (one entry per row) moves rows the LOD scheduler skipped that many ticks at once.
+        n = len(self.entities)
+        rows = np.arange(n) if mask is None else np.flatnonzero(mask)
+        count = len(rows)
+        if count == 0:
+            return
+        c = self.columns
+        x, y, speed, direction = c["x"][rows], c["y"][rows], c["speed"][rows], c["direction"][rows]
+
+        if bravery_scaled:
+            # Fearful animals creep at half speed and change direction more often
+            fearful = c["bravery"][rows] < 0.5
+            step = np.where(fearful, speed * 0.5, speed)
+            chance = np.where(fearful, fearful_turn_chance, turn_chance)
+        else:
+            step, chance = speed, turn_chance
+        if steps is not None:
+            steps = steps[rows]
+            step = step * steps
+            chance = 1 - (1 - chance) ** steps  # Chance of turning at least once on the way
+            hunger_decay = hunger_decay * steps
+
+        x += np.cos(direction) * step
+        y += np.sin(direction) * step
+        generator = self.rng.generator
+        turning = generator.random(count) < chance
+        direction += np.where(turning, generator.uniform(-0.5, 0.5, count), 0.0)
+
+        if self.bounds is not None:
+            # Bounce off the world edges and clamp into bounds
+            width, height = self.bounds
+            direction = np.where((x <= 0) | (x >= width), math.pi - direction, direction)
+            direction = np.where((y <= 0) | (y >= height), -direction, direction)
+            x, y = np.clip(x, 0, width), np.clip(y, 0, height)
+        c["x"][rows] = x
+        c["y"][rows] = y
+        c["direction"][rows] = direction
+        c["hunger"][rows] -= hunger_decay
+
+class Vegetation:
+    # Biomass raster over a window of map cells: one small integer per cell, with the id of the
+    # plant each green cell belongs to beside it. A vectorized cellular automaton grows it and
+    # grazing bites into it in place, so a tick costs the same few array operations however
+    # much of the map is green.
+    def __init__(self, game_map, rng):
+        self.game_map = game_map
+        self.rng = rng  # Random stream of the automaton
+        self.growth_rate = Plant.GROWTH_RATE  # This world's value, see TUNABLES
+        self.fertile = np.array(game_map.fertile)  # By zone id
+        self.area = (0, 0, 0, 0)  # (left, top, columns, rows) in cells
+        self.biomass = np.zeros((0, 0), dtype=np.uint8)
+        self.owner = np.zeros((0, 0), dtype=np.int64)  # Plant id of each cell, 0 where bare
+        self.counts = {}  # plant id -> green cells it owns
+        self.buckets = np.zeros((0, 0), dtype=np.int32)  # Green cells per FOOD_BUCKET_CELLS square of cells
+        self.events = None  # EventLog recording cell changes, if any
+
+    def cover(self, area):
+        # Move the window to area, keeping the cells both windows share
+        if area == self.area:
+            return
+        left, top, columns, rows = area
+        old_left, old_top, old_columns, old_rows = self.area
+        biomass = np.zeros((rows, columns), dtype=np.uint8)
+        owner = np.zeros((rows, columns), dtype=np.int64)
+        x0, x1 = max(left, old_left), min(left + columns, old_left + old_columns)
+        y0, y1 = max(top, old_top), min(top + rows, old_top + old_rows)
+        if x0 < x1 and y0 < y1:
+            kept = (slice(y0 - old_top, y1 - old_top), slice(x0 - old_left, x1 - old_left))
+            biomass[y0 - top:y1 - top, x0 - left:x1 - left] = self.biomass[kept]
+            owner[y0 - top:y1 - top, x0 - left:x1 - left] = self.owner[kept]
+            self.owner[kept] = 0
+        if self.events is not None:
+            # Whatever is still green in the old window is dropped
+            dropped_y, dropped_x = np.nonzero(self.owner)
+            self.log(self.owner[dropped_y, dropped_x], dropped_x + old_left, dropped_y + old_top, 0)
+        self.area, self.biomass, self.owner = area, biomass, owner
+        ids, counts = np.unique(owner[owner > 0], return_counts=True)
+        self.counts = dict(zip(ids.tolist(), counts.tolist()))
+        self.buckets = np.zeros((-(-rows // FOOD_BUCKET_CELLS), -(-columns // FOOD_BUCKET_CELLS)), dtype=np.int32)
+        self.file(*np.nonzero(owner), 1)
+
+    def file(self, y, x, change):
+        # Keep the bucket counts in step with cells (by window row and column) turning green or bare
+        np.add.at(self.buckets, (y // FOOD_BUCKET_CELLS, x // FOOD_BUCKET_CELLS), change)
+
+    def log(self, owners, xs, ys, biomass):
+        if len(owners):
+            cells = np.empty((len(owners), 4), dtype=np.int64)
+            cells[:, 0], cells[:, 1], cells[:, 2], cells[:, 3] = owners, xs, ys, biomass
+            self.events.vegetation(cells)
+
+    def put(self, plant, cells):
+        # Give a plant its cells, rows of (x, y, biomass); cells outside the window or already
+        # green are skipped
+        left, top, columns, rows = self.area
+        x, y = cells[:, 0] - left, cells[:, 1] - top
+        inside = np.flatnonzero((x >= 0) & (x < columns) & (y >= 0) & (y < rows))
+        x, y, biomass = x[inside], y[inside], cells[inside, 2]
+        bare = self.owner[y, x] == 0
+        x, y, biomass = x[bare], y[bare], biomass[bare]
+        if not len(x):
+            return
+        self.owner[y, x], self.biomass[y, x] = plant.id, biomass
+        self.counts[plant.id] = self.counts.get(plant.id, 0) + len(x)
+        self.file(y, x, 1)
+        if self.events is not None:
+            self.log(np.full(len(x), plant.id), x + left, y + top, biomass)
+
+    def take(self, plant):
+        # Clear a plant's cells out of the raster and return them as rows of (x, y, biomass)
+        if not self.counts.pop(plant.id, 0):
+            return np.zeros((0, 3), dtype=np.int64)
+        y, x = np.nonzero(self.owner == plant.id)
+        cells = np.stack([x + self.area[0], y + self.area[1], self.biomass[y, x]], axis=1).astype(np.int64)
+        self.owner[y, x], self.biomass[y, x] = 0, 0
+        self.file(y, x, -1)
+        return cells
+
+    def cells_by_owner(self):
+        # {plant id: rows of (x, y, biomass)} for every plant with green cells, in one pass
+        left, top, columns, _ = self.area
+        cells = np.flatnonzero(self.owner)
+        owners = self.owner.ravel()[cells]
+        order = np.argsort(owners, kind="stable")
+        cells, owners = cells[order], owners[order]
+        rows = np.stack([cells % columns + left, cells // columns + top,
+                         self.biomass.ravel()[cells]], axis=1).astype(np.int64)
+        ids, starts = np.unique(owners, return_index=True)
+        return dict(zip(ids.tolist(), np.split(rows, starts[1:])))
+
+    def green_cells(self, view):
+        # Map coordinates of the green cells inside a view rectangle, for drawing
+        left, top, columns, rows = self.area
+        cell_width, cell_height = self.game_map.cell_width, self.game_map.cell_height
+        x0 = max(int(view[0] // cell_width) - left, 0)
+        y0 = max(int(view[1] // cell_height) - top, 0)
+        x1 = min(int((view[0] + view[2]) // cell_width) + 1 - left, columns)
+        y1 = min(int((view[1] + view[3]) // cell_height) + 1 - top, rows)
+        if x0 >= x1 or y0 >= y1:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        y, x = np.nonzero(self.owner[y0:y1, x0:x1])
+        return x + x0 + left, y + y0 + top
+
+    def graze(self, plant, x, y, amount):
+        # Bite amount out of the cell under pixel (x, y) if it still belongs to plant; False
+        # when it has gone bare or changed hands since it was found
+        left, top, columns, rows = self.area
+        cell_x = int(x // self.game_map.cell_width) - left
+        cell_y = int(y // self.game_map.cell_height) - top
+        if not (0 <= cell_x < columns and 0 <= cell_y < rows) or self.owner[cell_y, cell_x] != plant.id:
+            return False
+        biomass = max(int(self.biomass[cell_y, cell_x]) - amount, 0)
+        self.biomass[cell_y, cell_x] = biomass
+        if biomass == 0:
+            self.owner[cell_y, cell_x] = 0
+            self.counts[plant.id] -= 1
+            if not self.counts[plant.id]:
+                del self.counts[plant.id]
+            self.buckets[cell_y // FOOD_BUCKET_CELLS, cell_x // FOOD_BUCKET_CELLS] -= 1
+        if self.events is not None:
+            self.log([plant.id], [cell_x + left], [cell_y + top], biomass)
+        return True
+
+    def grow(self, sunlight, humidity):
+        # One step of the automaton. Every green cell in a fertile zone whose local light and
+        # moisture are good enough passes Plant.growth_probability or not; those that pass
+        # regrow one biomass and, unless their plant already covers MAX_PLANTS cells, seed one
+        # or two of their four neighbours that are bare and fertile. A bare cell seeded from
+        # several sides goes to the first.
+        green = np.flatnonzero(self.owner)
+        if not len(green):
+            return
+        left, top, columns, rows = self.area
+        game_map = self.game_map
+        temperature, cell_humidity = game_map.climate_window(left, top, columns, rows)
+        fertile = self.fertile[game_map.zone_window(left, top, columns, rows)].ravel()
+        sunlight = sunlight + temperature.ravel()[green] - CLIMATE_MEAN_TEMPERATURE
+        humidity = (humidity + cell_humidity.ravel()[green]) / 2
+        generator = self.rng.generator
+        passed = generator.random(len(green)) < Plant.growth_probability(sunlight, humidity, self.growth_rate)
+        growing = green[passed & fertile[green] & (sunlight > 20) & (humidity > 50)]
+        if not len(growing):
+            return
+        biomass, owner = self.biomass.ravel(), self.owner.ravel()
+        regrown = growing[biomass[growing] < BIOMASS_MAX]
+        biomass[regrown] += 1
+
+        # Look each growing plant's size up once, not once per growing cell
+        counts = self.counts
+        ids, plant_of = np.unique(owner[growing], return_inverse=True)
+        sizes = np.fromiter(map(counts.__getitem__, ids.tolist()), dtype=np.int64, count=len(ids))
+        sources = growing[sizes[plant_of.ravel()] < MAX_PLANTS]
+        first = generator.integers(0, 4, len(sources))
+        second = (first + generator.integers(1, 4, len(sources))) % 4
+        both = generator.random(len(sources)) < 0.5
+        direction = np.concatenate([first, second[both]])
+        source = np.concatenate([sources, sources[both]])
+        x = source % columns + np.array([-1, 1, 0, 0])[direction]  # Left, right, up, down
+        y = source // columns + np.array([0, 0, -1, 1])[direction]
+        inside = (x >= 0) & (x < columns) & (y >= 0) & (y < rows)
+        source, target = source[inside], (y * columns + x)[inside]
+        open_cells = (owner[target] == 0) & fertile[target]
+        target, first_source = np.unique(target[open_cells], return_index=True)
+        owner[target], biomass[target] = owner[source[open_cells][first_source]], BIOMASS_MAX
+        if len(target):
+            for plant_id, added in zip(*np.unique(owner[target], return_counts=True)):
+                counts[plant_id.item()] += added.item()
+            self.file(target // columns, target % columns, 1)
+        if self.events is not None:
+            changed = np.concatenate([regrown, target])
+            self.log(owner[changed], changed % columns + left, changed // columns + top, biomass[changed])
+
+class PlantList(EntityList):
+    # The plants. While a plant is in the list its cells live in the Vegetation raster; out
+    # of it (parked with its chunk, or in a snapshot) they travel with it as plant.cells. The
+    # FoodIndex finds the nearest green cell for the grazers.
+    def __init__(self, vegetation, registry=None, rng=random):
+        super().__init__(Plant, registry, rng)
+        self.vegetation = vegetation
+        self.food = FoodIndex(vegetation, self.registry)
+        self.zone_counts = np.zeros(len(vegetation.game_map.zones), dtype=np.int64)  # Plants by root zone
+        self.health_total = 0  # Summed health of the plants, for the statistics
+
+    def append(self, plant):
+        super().append(plant)
+        self.vegetation.put(plant, plant.cells)
+        plant.cells = None
+        self.zone_counts[plant.zone_id] += 1
+        self.health_total += plant.health
+
+    def remove(self, plant):
+        if plant.cells is None:
+            plant.cells = self.vegetation.take(plant)
+        super().remove(plant)
+        self.zone_counts[plant.zone_id] -= 1
+        self.health_total -= plant.health
+
+    def kill(self, plant, killer=None):
+        if plant.alive:
+            self.vegetation.take(plant)  # Bare at once, not at the flush
+        super().kill(plant, killer)
+
+    def graze(self, plant, x, y, eater):
+        # One bite from the plant's cell at pixel (x, y); the plant dies with its last cell
+        if not self.vegetation.graze(plant, x, y, GRAZE_BITE):
+            return False
+        if plant.id not in self.vegetation.counts:
+            self.kill(plant, eater)
+        return True
+
+def pair_up(x, y, reach, seekers, partners):
+    # Pairs (first rows, second rows) with every seeker row in at most one pair, as the first
+    # or second, and every first row a seeker. Seekers only pair with partner rows (seekers
+    # are partners too) within their own reach. Rows sharing a square cell narrow enough that
+    # its diagonal is under every reach pair off two by two in one sorted pass, seekers first.
+    # The few seekers left over then take the nearest row still free in the cells of side
+    # reach around them, in row order.
+    rows = np.flatnonzero(partners)
+    side = reach[rows].min() / math.sqrt(2)
+    keys = SpatialGrid.key(np.floor_divide(x[rows], side).astype(np.int64),
+                           np.floor_divide(y[rows], side).astype(np.int64))
+    order = np.lexsort((rows, ~seekers[rows], keys))
+    rows, keys = rows[order], keys[order]
+    new_cell = np.r_[True, keys[1:] != keys[:-1]]
+    starts = np.flatnonzero(new_cell)
+    position = np.arange(len(rows)) - starts[np.cumsum(new_cell) - 1]
+    pairs = np.flatnonzero((position[:-1] % 2 == 0) & ~new_cell[1:] & seekers[rows[:-1]])
+    first, second = rows[pairs], rows[pairs + 1]
+
+    free = partners.copy()
+    free[first], free[second] = False, False
+    left = np.flatnonzero(seekers & free)
+    if len(left):
+        # Every free row in the 3x3 cells of side reach around each leftover seeker, nearest first
+        candidates = np.flatnonzero(free)
+        side = reach[left].max()
+        cell_x = np.floor_divide(x[candidates], side).astype(np.int64)
+        cell_y = np.floor_divide(y[candidates], side).astype(np.int64)
+        keys = SpatialGrid.key(cell_x, cell_y)
+        order = np.argsort(keys, kind="stable")
+        candidates, keys = candidates[order], keys[order]
+        seeker_x = np.floor_divide(x[left], side).astype(np.int64)
+        seeker_y = np.floor_divide(y[left], side).astype(np.int64)
+        dx, dy = np.meshgrid(np.arange(-1, 2), np.arange(-1, 2))
+        near = SpatialGrid.key(seeker_x[:, None] + dx.ravel(), seeker_y[:, None] + dy.ravel()).ravel()
+        begin, end = np.searchsorted(keys, near, "left"), np.searchsorted(keys, near, "right")
+        count = end - begin
+        seeker = np.repeat(np.repeat(left, 9), count)
+        candidate = candidates[np.repeat(begin - (np.cumsum(count) - count), count) + np.arange(count.sum())]
+        distance = np.hypot(x[candidate] - x[seeker], y[candidate] - y[seeker])
+        within = np.flatnonzero((distance < reach[seeker]) & (candidate != seeker))
+        seeker, candidate, distance = seeker[within], candidate[within], distance[within]
+        order = np.lexsort((candidate, distance, seeker))
+        seeker, candidate = seeker[order].tolist(), candidate[order].tolist()
+        taken, more = set(), ([], [])
+        for row, other in zip(seeker, candidate):
+            if row not in taken and other not in taken:
+                taken.update((row, other))
+                more[0].append(row)
+                more[1].append(other)
+        first, second = np.r_[first, more[0]].astype(np.int64), np.r_[second, more[1]].astype(np.int64)
+    order = np.argsort(first, kind="stable")
+    return first[order], second[order]
+
+DENSE_CELLS = 1 << 16  # Largest box of cells cell_sums bins into directly instead of sorting
+
+def cell_sums(cell_x, cell_y, weights, block=False):
+    # Per entity: the count and each of weights summed over the entities in its grid cell, or
+    # over the 3x3 block of cells around it with block=True. Rows follow (count, *weights).
+    # A group whose cells fit in a box of DENSE_CELLS is binned straight into that box;
+    # one spread thinner (across a chunked world) sorts its occupied cells instead.
+    left, top = int(cell_x.min()) - 1, int(cell_y.min()) - 1  # An empty border for the block sums
+    columns, rows = int(cell_x.max()) - left + 2, int(cell_y.max()) - top + 2
+    if columns * rows <= DENSE_CELLS:
+        inverse = (cell_y - top) * columns + (cell_x - left)
+        size = columns * rows
+        sums = np.stack([np.bincount(inverse, minlength=size)]
+                        + [np.bincount(inverse, weights=weight, minlength=size) for weight in weights])
+        if block:
+            # Shifting the flattened box by a neighbour's offset lines every cell up with that
+            # neighbour; only the empty border rows pick up wrapped-around cells
+            grid, sums = sums, np.zeros_like(sums)
+            start, end = columns + 1, size - columns - 1
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    offset = dy * columns + dx
+                    sums[:, start:end] += grid[:, start + offset:end + offset]
+        return sums.take(inverse, axis=1)
+
+    keys = (cell_x << 32) | (cell_y & 0xFFFFFFFF)
+    cells, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.ravel()
+    sums = np.stack([np.bincount(inverse, minlength=len(cells))]
+                    + [np.bincount(inverse, weights=weight, minlength=len(cells)) for weight in weights])
+    if block:
+        cells_x, cells_y = cells >> 32, (cells & 0xFFFFFFFF).astype(np.int32).astype(np.int64)
+        grid, sums = sums, np.zeros_like(sums)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                neighbour = ((cells_x + dx) << 32) | ((cells_y + dy) & 0xFFFFFFFF)
+                index = np.minimum(np.searchsorted(cells, neighbour), len(cells) - 1)
+                found = np.flatnonzero(cells[index] == neighbour)
+                sums[:, found] += grid[:, index[found]]
+    return sums.take(inverse, axis=1)
+
+class Flock:
+    # Boids steering for a whole EntityStore at once: every member turns towards the centre of
+    # the flockmates around it (cohesion), towards their average heading (alignment) and away
+    # from those crowding it (separation). Flockmates are the members in the 3x3 block of
+    # radius-sized cells around a member, and crowding ones those in its own
+    # separation-sized cell, so a tick costs a few bincounts whatever the flock's size.
+    def __init__(self, radius, separation_radius, cohesion, alignment, separation):
+        self.radius = radius
+        self.separation_radius = separation_radius
+        self.cohesion = cohesion
+        self.alignment = alignment
+        self.separation = separation
+
+    def steer(self, group, mask=None):
+        # Turn the rows selected by mask (all by default); every row counts as a flockmate
+        n = len(group)
+        if n < 2:
+            return
+        x, y, direction = group.column("x"), group.column("y"), group.column("direction")
+        heading_x, heading_y = np.cos(direction), np.sin(direction)
+
+        # Sums over the 3x3 block of radius-sized cells around each member
+        count, sum_x, sum_y, sum_heading_x, sum_heading_y = cell_sums(
+            np.floor(x / self.radius).astype(np.int64), np.floor(y / self.radius).astype(np.int64),
+            (x, y, heading_x, heading_y), block=True)
+        mates = count - 1  # Everyone but the member itself
+        flocking = mates > 0 if mask is None else (mates > 0) & mask
+        mates = np.maximum(mates, 1)
+        centre_x, centre_y = (sum_x - x) / mates, (sum_y - y) / mates
+        average_x, average_y = (sum_heading_x - heading_x) / mates, (sum_heading_y - heading_y) / mates
+
+        # Crowding: the others in the member's own separation-sized cell
+        near_count, near_sum_x, near_sum_y = cell_sums(
+            np.floor(x / self.separation_radius).astype(np.int64),
+            np.floor(y / self.separation_radius).astype(np.int64), (x, y))
+        others = near_count - 1
+        crowd = np.where(others > 0, self.separation / self.separation_radius, 0)
+        others = np.maximum(others, 1)
+        crowd_x, crowd_y = (near_sum_x - x) / others, (near_sum_y - y) / others
+
+        steer_x = (heading_x + self.alignment * (average_x - heading_x)
+                   + self.cohesion * (centre_x - x) / self.radius + crowd * (x - crowd_x))
+        steer_y = (heading_y + self.alignment * (average_y - heading_y)
+                   + self.cohesion * (centre_y - y) / self.radius + crowd * (y - crowd_y))
+        direction[flocking] = np.arctan2(steer_y[flocking], steer_x[flocking])
+
+BIRD_FLOCK = Flock(radius=50, separation_radius=10, cohesion=0.1, alignment=0.5, separation=1.5)
+LION_PRIDE = Flock(radius=80, separation_radius=16, cohesion=0.8, alignment=0.3, separation=0.6)
 
 class Plant:
-    def __init__(self, x, y, game_map):
+    DEATH_CAUSES = ("withered", "grazed")  # Names of EntityList.deaths in the statistics
+    GROWTH_RATE = 0.000001  # Growth probability per unit of humidity times sunlight
+    __slots__ = ("rng", "_store", "_row", "id", "alive", "x", "y", "health", "game_map",
+                 "cell_x", "cell_y", "zone_id", "zone", "cells")
+
+    def __init__(self, x, y, game_map, rng=random):
+        self.rng = rng
+        self._store = None  # EntityList this plant lives in
+        self._row = -1
+        self.id = None  # Stable id handed out by the EntityRegistry
+        self.alive = True
         self.x = x
         self.y = y
-        self.size = 10  # Size of the plant patch (e.g., 10 pixels)
         self.health = 100
-        self.growth_patches = [(self.x, self.y)]  # List to store the coordinates of all growth patches
         self.game_map = game_map
         self.update_zone()  # Determine the zone based on the plant's location
+        # Its cells as rows of (x, y, biomass) while outside a PlantList, starting with the root
+        self.cells = np.array([[self.cell_x, self.cell_y, BIOMASS_MAX]], dtype=np.int64)
 
     def update_zone(self):
-        # Update the zone for the current location of the plant
-        cell_width = SCREEN_WIDTH // self.game_map.width
-        cell_height = SCREEN_HEIGHT // self.game_map.height
-        self.zone = self.game_map.get_zone(self.x // cell_width, self.y // cell_height)
-
-    def grow(self, sunlight, humidity, nearby_plants=None):
-        if len(self.growth_patches) >= MAX_PLANTS:
-            return  # Stop growth if the maximum number of growth patches is reached
-
-        # Grass growth depends on sunlight and humidity in Grassland or Forest zones
-        if self.zone and self.zone.name in ["Grassland", "Forest"]:
-            if sunlight > 20 and humidity > 50:
-                if random.random() < self.growth_probability(sunlight, humidity):
-                    # Grow by extending from the current plant's growth patches
-                    self._extend_growth(nearby_plants)
-            else:
+        # Update the cell and zone for the current location of the plant
+        game_map = self.game_map
+        self.cell_x, self.cell_y = game_map.clamp_cell(int(self.x // game_map.cell_width),
+                                                       int(self.y // game_map.cell_height))
+        self.zone_id = game_map.get_zone_id(self.cell_x, self.cell_y)
+        self.zone = game_map.zones[self.zone_id]
+
+    def wither(self, sunlight, humidity, nearby_plants=None):
+        # The plant's cells grow with the Vegetation automaton; the plant itself withers while
+        # the climate at its root is too harsh for grass in a Grassland or Forest zone. The
+        # global levels are adjusted by the root cell: warmer cells get more sun, and the
+        # humidity is the average of the global level and the cell's.
+        game_map = self.game_map
+        if game_map.fertile[self.zone_id]:
+            temperature, cell_humidity = game_map.climate_at(self.cell_x, self.cell_y)
+            sunlight = sunlight + temperature - CLIMATE_MEAN_TEMPERATURE
+            humidity = (humidity + cell_humidity) / 2
+            if not (sunlight > 20 and humidity > 50):
                 # Grass may die if conditions are too harsh
                 self.health -= 1
+                plants = self._store
+                if plants is not None:
+                    plants.health_total -= 1
+                    if plants.events is not None:
+                        plants.events.eaten(self)
                 if self.health <= 0:
                     if nearby_plants is not None:
-                        nearby_plants.remove(self)
-
-    def _extend_growth(self, nearby_plants):
-        new_patches = []
-        for (px, py) in self.growth_patches:
-            # Pick a random number of directions to grow (can grow in 1 to 4 directions)
-            directions = random.sample([(-1, 0), (1, 0), (0, -1), (0, 1)], random.randint(1,2))
-
-            for dx, dy in directions:  # Left, right, up, down
-                cell_width = SCREEN_WIDTH // self.game_map.width
-                cell_height = SCREEN_HEIGHT // self.game_map.height
-
-                new_x = (px + dx * self.size * 2) // cell_width
-                new_y = (py + dy * self.size * 2) // cell_height
-
-                # Ensure new coordinates are within bounds
-                new_x = min(max(new_x, 0), self.game_map.width - 1)
-                new_y = min(max(new_y, 0), self.game_map.height - 1)
-
-                # Check if the new location is already part of the plant
-                if (new_x, new_y) not in self.growth_patches and (new_x, new_y) not in new_patches:
-                    # Check for the zone and if there is already a plant at the new location
-                    new_zone = self.game_map.get_zone(new_x, new_y)
-                    if new_zone and not any(p.x == new_x and p.y == new_y for p in nearby_plants):
-                        # Add the new patch to grow further
-                        new_patches.append((px + dx * self.size * 2, py + dy * self.size * 2))
-
-        # Add all newly grown patches to the plant
-        self.growth_patches.extend(new_patches)
-
-    def growth_probability(self, sunlight, humidity):
-        # Customize growth probability based on environmental factors
-        return (humidity * sunlight) * 0.000001
-
-    def be_eaten(self, amount):
-        self.health -= amount
-        if self.health <= 0:
-            self.size = 0
-            self.growth_patches = []  # Remove all patches if the plant dies
-            return True
-        return False
+                        nearby_plants.kill(self)
 
-    def draw(self):
-        # Draw each growth patch of the plant
-        plant_size = self.size * 2
-        for (px, py) in self.growth_patches:
-            rl.draw_rectangle(px - plant_size // 2, py - plant_size // 2, plant_size, plant_size, rl.GREEN)
+    @staticmethod
+    def growth_probability(sunlight, humidity, growth_rate=None):
+        # Customize growth probability based on environmental factors; works on arrays too
+        return (humidity * sunlight) * (Plant.GROWTH_RATE if growth_rate is None else growth_rate)
 
 class Animal:
-    def __init__(self, x, y):
+    MARKER_RADIUS = 6
+    MARKER_COLOR = (127, 106, 79, 255)  # raylib BROWN
+
+    x = Column()
+    y = Column()
+    speed = Column()
+    direction = Column()
+    hunger = Column()
+    health = Column()
+    bravery = Column()
+    size = Column()
+    reproduction_range = Column()  # Range within which animals can reproduce
+    has_reproduced = Column()  # 1 once the animal has reproduced, as it only does so once
+
+    DEATH_CAUSES = ("starved", "hunted")  # Names of EntityList.deaths in the statistics
+
+    # Per-animal state beyond the store columns, kept when an animal is parked or saved
+    SAVED_FIELDS = ("id", "reproduction_chance")
+    # Slots instead of a __dict__: at millions of animals the per-object dict would dominate memory
+    __slots__ = ("rng", "_store", "_row", "_detached", "id", "alive") + SAVED_FIELDS[1:]
+
+    def __init__(self, x, y, rng=random):
+        self.rng = rng  # Random stream for this animal's draws, the store's once attached
+        self._store = None  # EntityStore holding this animal's columns once attached
+        self._row = -1
+        self._detached = {}  # Column values while the animal is not in a store
+        self.id = None  # Stable id handed out by the EntityRegistry
+        self.alive = True
         self.x = x
         self.y = y
-        self.speed = random.uniform(1.0, 2.5)
+        self.speed = rng.uniform(1.0, 2.5)
         self.health = 100
-        self.direction = random.uniform(0, 2 * math.pi)  # Direction in radians
-        self.reproduction_range = 50  # Range within which animals can reproduce
+        self.direction = rng.uniform(0, 2 * math.pi)  # Direction in radians
+        self.reproduction_range = 50
         self.reproduction_chance = 0.1  # Chance to reproduce if another animal is nearby
-        self.has_reproduced = False  # Track if this animal has already reproduced
-        self.bravery = random.uniform(0, 1)  # 0 = fearful, 1 = brave
-        self.size = random.uniform(1, 10)
+        self.has_reproduced = 0
+        self.bravery = rng.uniform(0, 1)  # 0 = fearful, 1 = brave
+        self.size = rng.uniform(1, 10)
         self.hunger = 100
 
+    @property
+    def hunt_hunger(self):
+        # The HUNT_HUNGER of the world this animal lives in, the class default outside one
+        return self.HUNT_HUNGER if self._store is None else self._store.hunt_hunger
+
     def move(self):
         # Move in the current direction
         if self.bravery < 0.5:
@@ -118,75 +844,91 @@ class Animal:
             self.y += math.sin(self.direction) * self.speed * 0.5
 
             # Randomly change direction more frequently
-            if random.random() < 0.05:
-                self.direction += random.uniform(-0.5, 0.5)
+            if self.rng.random() < 0.05:
+                self.direction += self.rng.uniform(-0.5, 0.5)
         else:
             # Normal movement
             self.x += math.cos(self.direction) * self.speed
             self.y += math.sin(self.direction) * self.speed
 
             # Randomly change direction
-            if random.random() < 0.02:  # 2% chance to change direction each frame
-                self.direction += random.uniform(-0.5, 0.5)
+            if self.rng.random() < 0.02:  # 2% chance to change direction each frame
+                self.direction += self.rng.uniform(-0.5, 0.5)
 
-        # Check for boundary collision and adjust direction
-        if self.x <= 0 or self.x >= SCREEN_WIDTH:
-            self.direction = math.pi - self.direction
-        if self.y <= 0 or self.y >= SCREEN_HEIGHT:
-            self.direction = -self.direction
+        bounds = self.bounds()
+        if bounds is not None:
+            width, height = bounds
+            # Check for boundary collision and adjust direction
+            if self.x <= 0 or self.x >= width:
+                self.direction = math.pi - self.direction
+            if self.y <= 0 or self.y >= height:
+                self.direction = -self.direction
 
-        # Ensure the animal stays within screen bounds
-        self.x = max(0, min(self.x, SCREEN_WIDTH))
-        self.y = max(0, min(self.y, SCREEN_HEIGHT))
+            # Ensure the animal stays within world bounds
+            self.x = max(0, min(self.x, width))
+            self.y = max(0, min(self.y, height))
 
         self.hunger-=0.05
 
+    def bounds(self):
+        # Pixel extent the animal bounces inside, or None in an unbounded world
+        return self._store.bounds if self._store is not None else (SCREEN_WIDTH, SCREEN_HEIGHT)
+
     def distance_to(self, entity):
         return math.hypot(self.x - entity.x, self.y - entity.y)
 
-    def reproduce(self, animals):
+    def reproduce(self, animals, grid):
         if self.has_reproduced:
             return  # Skip reproduction if this animal has already reproduced
 
-        for animal in animals:
-            if isinstance(animal, type(self)) and animal != self:
-                distance = self.distance_to(animal)
-                if distance < self.reproduction_range and not animal.has_reproduced:
-                    # Create a new animal at a random position nearby
-                    new_x = self.x + random.uniform(-10, 10)
-                    new_y = self.y + random.uniform(-10, 10)
-                    new_animal = type(self)(new_x, new_y)  # Create the same type of animal
-                    animals.append(new_animal)
-                    self.has_reproduced = True
-                    animal.has_reproduced = True
-                    break  # Only reproduce once
-
-    def eat_plants(self, plants):
+        for animal in grid.query(self.x, self.y, self.reproduction_range, (type(self),)):
+            if animal != self and not animal.has_reproduced:
+                # Create a new animal at a random position nearby
+                new_x = self.x + self.rng.uniform(-10, 10)
+                new_y = self.y + self.rng.uniform(-10, 10)
+                new_animal = animals.spawn(new_x, new_y)  # Create the same type of animal
+                animals.births += 1
+                grid.insert(new_animal)
+                self.has_reproduced = 1
+                animal.has_reproduced = 1
+                break  # Only reproduce once
+
+    def flee(self, grid, radius=30):
+        # Run directly away from the nearest threat in range; humans take precedence over
+        # predators. The simulation does this for whole groups at once from its InfluenceMap.
+        for kind in (Human, Predator):
+            threat, _ = grid.nearest(self.x, self.y, (kind,), radius)
+            if threat is not None:
+                self.direction = math.atan2(self.y - threat.y, self.x - threat.x)
+                return
+
+    def eat_plants(self, plants, food=None):
+        # food is the (plant, x, y) of the nearest green cell when the simulation has already
+        # looked it up for the whole group; without it this animal asks the plants' FoodIndex
         if self.hunger < 30:
-            if not plants:
-                return  # No plants to eat, exit the function
-
-            # Find the nearest plant
-            nearest_plant = min(plants, key=lambda plant: self.distance_to(plant))
-
-            # Move towards the nearest plant if not within eating range
-            if self.distance_to(nearest_plant) > 15:
-                self.move_towards(nearest_plant, step_size=2)  # Move towards the plant
-            else:
-                # Eat the plant if within range
-                if nearest_plant.size < 5:  # Small plants are completely eaten
-                    nearest_plant.health -= 100
-                    if nearest_plant.health <= 0:
-                        plants.remove(nearest_plant)
-                else:  # Large plants are partially eaten
-                    nearest_plant.be_eaten(2)
+            if food is None:
+                food = plants.food.nearest([self.x], [self.y])[0]
+                if food is None:
+                    return  # No plants to eat, exit the function
+
+            nearest_plant, food_x, food_y = food
+            if not nearest_plant.alive:
+                return  # Eaten by another animal since the lookup
+
+            # Move towards the nearest cell if not within eating range
+            if math.hypot(self.x - food_x, self.y - food_y) > 15:
+                self.move_towards_position(food_x, food_y, step_size=2)  # Move towards the plant
+            elif plants.graze(nearest_plant, food_x, food_y, self):  # Take a bite from the cell
                 self.health = min(self.health + 50, 100)  # Gain health from eating
                 self.hunger = min(self.hunger + 70, 100)  # Satisfy hunger
 
     def move_towards(self, target, step_size=1):
-        # Calculate the direction vector towards the target
-        direction_x = target.x - self.x
-        direction_y = target.y - self.y
+        self.move_towards_position(target.x, target.y, step_size)
+
+    def move_towards_position(self, target_x, target_y, step_size=1):
+        # Calculate the direction vector towards the target position
+        direction_x = target_x - self.x
+        direction_y = target_y - self.y
         
         # Normalize the direction vector
         distance = (direction_x**2 + direction_y**2) ** 0.5
@@ -196,50 +938,50 @@ class Animal:
         direction_x /= distance
         direction_y /= distance
         
-        # Move by step_size towards the target
+        # Move by step_size towards the target position
         self.x += direction_x * step_size
         self.y += direction_y * step_size
 
+    def marker_color(self):
+        return self.MARKER_COLOR
+
     def draw(self):
-        rl.draw_circle(self.x, self.y, 6, rl.BROWN)
+        rl.draw_circle(self.x, self.y, self.MARKER_RADIUS, self.marker_color())
 
 class Predator(Animal):
-    def __init__(self, x, y):
-        super().__init__(x, y)
-        self.speed = random.uniform(2.0, 4.0)
+    __slots__ = ()
+    MARKER_RADIUS = 7
+    MARKER_COLOR = (230, 41, 55, 255)  # raylib RED
+    HUNT_HUNGER = 50  # Only hunts while hunger is below this
+
+    def __init__(self, x, y, rng=random):
+        super().__init__(x, y, rng)
+        self.speed = rng.uniform(2.0, 4.0)
         self.hunger = 100  # Initial hunger level
 
-    def hunt(self, animals, predators, rabbits):
-        if self.hunger >= 50:
+    def hunt(self, animals, predators, rabbits, grid):
+        if self.hunger >= self.hunt_hunger:
             return  # Only hunt if hunger is less than threshold
 
         # Find the closest prey
-        closest_prey = None
-        min_distance = float('inf')
-
-        for prey in animals + rabbits:
-            distance = self.distance_to(prey)
-            if distance < min_distance:
-                min_distance = distance
-                closest_prey = prey
+        closest_prey, min_distance = grid.nearest(self.x, self.y, (Animal, Rabbit))
 
         if closest_prey and min_distance < 20:  # Within hunting range
             closest_prey.health -= 100
             if closest_prey.health <= 0:
                 if isinstance(closest_prey, Rabbit):
-                    rabbits.remove(closest_prey)
+                    rabbits.kill(closest_prey, self)
                 else:
-                    animals.remove(closest_prey)
+                    animals.kill(closest_prey, self)
+                grid.remove(closest_prey)
             self.hunger = 100  # Reset hunger after a successful hunt
         elif closest_prey:  # Move towards the closest prey
             angle = math.atan2(closest_prey.y - self.y, closest_prey.x - self.x)
             self.direction = angle
 
-    def move(self, animals, humans, rabbits):
+    def move(self, animals, humans, rabbits, grid):
         if self.hunger < 60:
-            super().move()
-            self.hunger -= 0.1  # Decrease hunger over time
-            self.hunt(animals, None, rabbits)  # Hunt if hungry
+            self.stalk(animals, rabbits, grid)
         else:
             # Stop moving if hunger is above or equal to threshold
             self.hunger -= 0.1
@@ -247,45 +989,57 @@ class Predator(Animal):
             self.y += math.sin(self.direction) * self.speed
 
             # Check for boundary collision and adjust direction
-            if self.x <= 0 or self.x >= SCREEN_WIDTH:
+            bounds = self.bounds()
+            if bounds is not None and (self.x <= 0 or self.x >= bounds[0]):
                 self.direction = math.pi - self.direction
-            if self.y <= 0 or self.y >= SCREEN_HEIGHT:
+            if bounds is not None and (self.y <= 0 or self.y >= bounds[1]):
                 self.direction = -self.direction
 
             # Randomly change direction
-            if random.random() < 0.02:  # 2% chance to change direction each frame
-                self.direction += random.uniform(-0.5, 0.5)
-
-            # Ensure the animal stays within screen bounds
-            self.x = max(0, min(self.x, SCREEN_WIDTH))
-            self.y = max(0, min(self.y, SCREEN_HEIGHT))
-        for human in humans:
-            if self.distance_to(human) < 20:  # Within attack range
-                human.health -= 45
-                if human.health <= 0:
-                    humans.remove(human)
-                # Retaliate by attacking the human
-                self.hunger = min(self.hunger + 55, 100)
+            if self.rng.random() < 0.02:  # 2% chance to change direction each frame
+                self.direction += self.rng.uniform(-0.5, 0.5)
 
-    def draw(self):
-        rl.draw_circle(self.x, self.y, 7, rl.RED)
+            # Ensure the animal stays within world bounds
+            if bounds is not None:
+                self.x = max(0, min(self.x, bounds[0]))
+                self.y = max(0, min(self.y, bounds[1]))
+        self.attack_humans(humans, grid)
+
+    def stalk(self, animals, rabbits, grid):
+        super().move()
+        self.hunger -= 0.1  # Decrease hunger over time
+        self.hunt(animals, None, rabbits, grid)  # Hunt if hungry
+
+    def attack_humans(self, humans, grid):
+        for human in grid.query(self.x, self.y, 20, (Human,)):  # Within attack range
+            human.health -= 45
+            if human.health <= 0:
+                humans.kill(human, self)
+                grid.remove(human)
+            # Retaliate by attacking the human
+            self.hunger = min(self.hunger + 55, 100)
 
 class Lion(Predator):
-    def __init__(self, x, y):
-        super().__init__(x, y)
-        self.speed = random.uniform(3.0, 4.0)  # Faster than base predator
+    __slots__ = ()
+    MARKER_RADIUS = 8
+    MARKER_COLOR = (76, 63, 47, 255)  # raylib DARKBROWN, distinct color for Lion
+    HUNT_HUNGER = 60
+
+    def __init__(self, x, y, rng=random):
+        super().__init__(x, y, rng)
+        self.speed = rng.uniform(3.0, 4.0)  # Faster than base predator
         self.hunger = 100
 
-    def hunt(self, animals,predators, rabbits):
-        if self.hunger >= 60:
-            return  # Only hunt if hunger is less than 60
+    def hunt(self, animals,predators, rabbits, grid):
+        if self.hunger >= self.hunt_hunger:
+            return  # Only hunt if hunger is less than threshold
 
         # Lion behavior: prioritize larger animals
         largest_prey = None
         max_size = 0
 
-        for prey in animals + rabbits:
-            if prey.size >= max_size:  # Assuming animals have a `size` attribute
+        for prey in itertools.chain(animals, rabbits):
+            if prey.alive and prey.size >= max_size:  # Assuming animals have a `size` attribute
                 max_size = prey.size
                 largest_prey = prey
 
@@ -293,173 +1047,139 @@ class Lion(Predator):
             largest_prey.health -= 100
             if largest_prey.health <= 0:
                 if isinstance(largest_prey, Rabbit):
-                    rabbits.remove(largest_prey)
+                    rabbits.kill(largest_prey, self)
                 else:
-                    animals.remove(largest_prey)
+                    animals.kill(largest_prey, self)
+                grid.remove(largest_prey)
             self.hunger = 100  # Reset hunger after a successful hunt
         elif largest_prey:
             angle = math.atan2(largest_prey.y - self.y, largest_prey.x - self.x)
             self.direction = angle
 
-    def move_as_group(lions, animals, humans, rabbits, group_size=3, proximity_threshold=20):
-        # Ensure lions move as a group
+    @staticmethod
+    def move_as_group(lions, wandering=None, group_size=3):
+        # Keep the pride together: wandering lions (all by default) steer by the pride's flocking
+        # rules before they move. Fewer than group_size lions roam on their own.
         if len(lions) >= group_size:
-            # Calculate the group's average position
-            avg_x = sum(lion.x for lion in lions) / len(lions)
-            avg_y = sum(lion.y for lion in lions) / len(lions)
-
-            # Move each lion towards the average position to stay as a group
-            for lion in lions:
-                if lion.distance_to(avg_x, avg_y) > proximity_threshold:
-                    lion.move_towards_position(avg_x, avg_y, step_size=2)
-
-                # Proceed with regular movement and hunger check
-                lion.move(animals, humans, rabbits)
-                if lion.hunger <= 0:
-                    lions.remove(lion)
-
-    def move_towards_position(self, target_x, target_y, step_size=1):
-        # Calculate the direction vector towards the target position
-        direction_x = target_x - self.x
-        direction_y = target_y - self.y
-        
-        # Normalize the direction vector
-        distance = (direction_x**2 + direction_y**2) ** 0.5
-        if distance == 0:  # Prevent division by zero
-            return
-
-        direction_x /= distance
-        direction_y /= distance
-        
-        # Move by step_size towards the target position
-        self.x += direction_x * step_size
-        self.y += direction_y * step_size
-
-    def draw(self):
-        rl.draw_circle(self.x, self.y, 8, rl.DARKBROWN)  # Distinct color for Lion
+            LION_PRIDE.steer(lions, wandering)
 
 class Tiger(Predator):
-    def __init__(self, x, y):
-        super().__init__(x, y)
-        self.speed = random.uniform(2.5, 4.5)  # Faster and more aggressive
+    __slots__ = ()
+    MARKER_RADIUS = 8
+    MARKER_COLOR = (255, 161, 0, 255)  # raylib ORANGE, distinct color for Tiger
+    HUNT_HUNGER = 60
+
+    def __init__(self, x, y, rng=random):
+        super().__init__(x, y, rng)
+        self.speed = rng.uniform(2.5, 4.5)  # Faster and more aggressive
         self.hunger = 100
 
-    def hunt(self, animals,predators, rabbits):
-        if self.hunger >= 60:
-            return  # Only hunt if hunger is less than 60
+    def hunt(self, animals,predators, rabbits, grid):
+        if self.hunger >= self.hunt_hunger:
+            return  # Only hunt if hunger is less than threshold
 
         # Tiger behavior: aggressive hunting
-        closest_prey = None
-        min_distance = float('inf')
-
-        for prey in animals + rabbits:
-            distance = self.distance_to(prey)
-            if distance < min_distance:
-                min_distance = distance
-                closest_prey = prey
+        closest_prey, min_distance = grid.nearest(self.x, self.y, (Animal, Rabbit))
 
         if closest_prey and min_distance < 20:  # Within hunting range
             closest_prey.health -= 80  # More damage compared to Lion
             if closest_prey.health <= 0:
                 if isinstance(closest_prey, Rabbit):
-                    rabbits.remove(closest_prey)
+                    rabbits.kill(closest_prey, self)
                 else:
-                    animals.remove(closest_prey)
+                    animals.kill(closest_prey, self)
+                grid.remove(closest_prey)
             self.hunger = 100  # Reset hunger after a successful hunt
         elif closest_prey:
             angle = math.atan2(closest_prey.y - self.y, closest_prey.x - self.x)
             self.direction = angle
 
-    def draw(self):
-        rl.draw_circle(self.x, self.y, 8, rl.ORANGE)  # Distinct color for Tiger
-
 class Human(Animal):
-    def __init__(self, x, y):
-        super().__init__(x, y)
+    MARKER_RADIUS = 9
+    MARKER_COLOR = None  # Depends on emotion, see marker_color
+    HUNT_HUNGER = 50  # Only hunts animals while hunger is below this
+    SAVED_FIELDS = Animal.SAVED_FIELDS + ("emotion", "greedy")
+    __slots__ = ("emotion", "greedy")
+    EMOTION_COLORS = {
+        HAPPY: (173, 216, 230, 255),
+        SAD: (0, 121, 241, 255),  # raylib BLUE
+        ANGRY: (0, 82, 172, 255),  # raylib DARKBLUE
+        FEARFUL: (106, 90, 205, 255),
+    }
+
+    def __init__(self, x, y, rng=random):
+        super().__init__(x, y, rng)
         self.speed = 1.5
         self.hunger = 100  # Initial hunger level
-        self.emotion = random.choice(['happy', 'sad', 'angry', 'fearful'])  # Random initial emotion
-        self.greedy = random.choice([True, False])  # Whether the human is greedy
+        self.emotion = rng.choice((HAPPY, SAD, ANGRY, FEARFUL))  # Random initial emotion
+        self.greedy = rng.choice([True, False])  # Whether the human is greedy
 
-    def hunt(self, animals, predators,rabbits):
+    def hunt(self, animals, predators,rabbits, grid):
         if self.hunger <= 0:
             return
 
         # Change behavior based on emotion
-        if self.emotion == 'fearful':
-            self.run_from_predators(predators)
-            self.hunt_animals(animals,rabbits)
-        elif self.emotion == 'angry':
-            self.hunt_predators(predators)
-            self.hunt_everything(animals,rabbits,predators)
-        elif self.emotion == 'happy' or self.emotion == 'sad':
-            self.hunt_animals(animals,rabbits)
+        if self.emotion == FEARFUL:
+            self.run_from_predators(grid)
+            self.hunt_animals(animals,rabbits, grid)
+        elif self.emotion == ANGRY:
+            self.hunt_predators(predators, grid)
+            self.hunt_everything(animals,rabbits,predators, grid)
+        elif self.emotion == HAPPY or self.emotion == SAD:
+            self.hunt_animals(animals,rabbits, grid)
     
-    def run_from_predators(self, predators):
-        for predator in predators:
-            if self.distance_to(predator) < 20:  # Within predator range
-                # Increase speed to escape
-                self.speed = 3.0
-                angle = math.atan2(self.y - predator.y, self.x - predator.x)
-                self.direction = angle
-                self.move()  # Move away from the predator
-                return  # Stop running after escaping
-
-    def hunt_predators(self, predators):
-        for predator in predators:
-            if self.distance_to(predator) < 20:  # Within predator range
-                # Hunt the predator
-                predator.health -= 50
-                if predator.health <= 0:
-                    predators.remove(predator)
-                self.hunger = min(self.hunger + 50, 100)
-                return  # Stop searching after a successful hunt
-
-    def hunt_animals(self, animals,rabbits):
-        if self.hunger < 50:
+    def run_from_predators(self, grid):
+        predator, _ = grid.nearest(self.x, self.y, (Predator,), radius=20)
+        if predator:  # Within predator range
+            # Increase speed to escape
+            self.speed = 3.0
+            angle = math.atan2(self.y - predator.y, self.x - predator.x)
+            self.direction = angle
+            self.move()  # Move away from the predator
+
+    def hunt_predators(self, predators, grid):
+        predator, _ = grid.nearest(self.x, self.y, (Predator,), radius=20)
+        if predator:  # Within predator range
+            # Hunt the predator
+            predator.health -= 50
+            if predator.health <= 0:
+                predators.kill(predator, self)
+                grid.remove(predator)
+            self.hunger = min(self.hunger + 50, 100)
+
+    def hunt_animals(self, animals,rabbits, grid):
+        if self.hunger < self.hunt_hunger:
             # Find the closest prey
-            closest_prey = None
-            min_distance = float('inf')
-
-            for prey in animals + rabbits:
-                distance = self.distance_to(prey)
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_prey = prey
+            closest_prey, min_distance = grid.nearest(self.x, self.y, (Animal, Rabbit))
 
             if closest_prey and min_distance < 20:  # Within hunting range
                 closest_prey.health -= 100
                 if closest_prey.health <= 0:
                     if isinstance(closest_prey, Rabbit):
-                        rabbits.remove(closest_prey)
+                        rabbits.kill(closest_prey, self)
                     else:
-                        animals.remove(closest_prey)
+                        animals.kill(closest_prey, self)
+                    grid.remove(closest_prey)
                 self.hunger = 100  # Reset hunger after a successful hunt
             elif closest_prey:  # Move towards the closest prey
                 angle = math.atan2(closest_prey.y - self.y, closest_prey.x - self.x)
                 self.direction = angle   
 
-    def hunt_everything(self, animals,rabbits,predators):
-        if self.hunger < 50:
+    def hunt_everything(self, animals,rabbits,predators, grid):
+        if self.hunger < self.hunt_hunger:
             # Find the closest prey
-            closest_prey = None
-            min_distance = float('inf')
-
-            for prey in animals + rabbits + predators:
-                distance = self.distance_to(prey)
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_prey = prey
+            closest_prey, min_distance = grid.nearest(self.x, self.y, (Animal, Rabbit, Predator))
 
             if closest_prey and min_distance < 20:  # Within hunting range
                 closest_prey.health -= 100
                 if closest_prey.health <= 0:
                     if isinstance(closest_prey, Rabbit):
-                        rabbits.remove(closest_prey)
+                        rabbits.kill(closest_prey, self)
                     elif isinstance(closest_prey, Predator):
-                        predators.remove(closest_prey)
+                        predators.kill(closest_prey, self)
                     else:
-                        animals.remove(closest_prey)
+                        animals.kill(closest_prey, self)
+                    grid.remove(closest_prey)
                 self.hunger = 100  # Reset hunger after a successful hunt
             elif closest_prey:  # Move towards the closest prey
                 angle = math.atan2(closest_prey.y - self.y, closest_prey.x - self.x)
@@ -467,17 +1187,17 @@ class Human(Animal):
 
     def move(self):
         # Adjust speed based on emotion
-        if self.emotion == 'happy':
+        if self.emotion == HAPPY:
             self.speed = 1.5
-        elif self.emotion == 'sad':
+        elif self.emotion == SAD:
             self.speed = 1.0
-        elif self.emotion == 'angry':
+        elif self.emotion == ANGRY:
             self.speed = 2.0
-        elif self.emotion == 'fearful':
+        elif self.emotion == FEARFUL:
             self.speed = 1.0
             # Avoid dangerous areas
-            if random.random() < 0.05:
-                self.direction += random.uniform(-math.pi / 4, math.pi / 4)
+            if self.rng.random() < 0.05:
+                self.direction += self.rng.uniform(-math.pi / 4, math.pi / 4)
 
         # Increase speed if greedy or very hungry
         if self.greedy or self.hunger < 55:
@@ -486,85 +1206,158 @@ class Human(Animal):
         super().move()
         self.hunger -= 0.05  # Decrease hunger over time
 
-    def draw(self):
-        color = rl.BLUE
-        if self.emotion == 'happy':
-            color = (173, 216, 230, 255) 
-        elif self.emotion == 'angry':
-            color = rl.DARKBLUE
-        elif self.emotion == 'fearful':
-            color = (106, 90, 205, 255)
-        elif self.emotion == 'sad':
-            color = rl.BLUE
-        rl.draw_circle(self.x, self.y, 9, color)
+    def marker_color(self):
+        return self.EMOTION_COLORS.get(self.emotion, self.EMOTION_COLORS[SAD])
 
 # Define new animal types
 class Rabbit(Animal):
-    def __init__(self, x, y):
-        super().__init__(x, y)
-        self.speed = random.uniform(1.5, 3.0)
-        self.reproduction_chance = 0.2
+    __slots__ = ()
+    MARKER_RADIUS = 4
+    MARKER_COLOR = (130, 130, 130, 255)  # raylib GRAY
 
-    def draw(self):
-        rl.draw_circle(self.x, self.y, 4, rl.GRAY)
+    def __init__(self, x, y, rng=random):
+        super().__init__(x, y, rng)
+        self.speed = rng.uniform(1.5, 3.0)
+        self.reproduction_chance = 0.2
 
 class Bird(Animal):
-    def __init__(self, x, y):
-        super().__init__(x, y)
-        self.speed = random.uniform(2.0, 4.0)
+    __slots__ = ()
+    MARKER_RADIUS = 4
+    MARKER_COLOR = (253, 249, 0, 255)  # raylib YELLOW
+
+    def __init__(self, x, y, rng=random):
+        super().__init__(x, y, rng)
+        self.speed = rng.uniform(2.0, 4.0)
         self.reproduction_chance = 0.3
 
-    def move(self, humans, predators):
+    def move(self, humans, predators, grid):
         # Avoid collisions with predators and humans
-        for predator in predators:
-            if self.distance_to(predator) < 70:
-                angle = math.atan2(self.y - predator.y, self.x - predator.x)
-                self.direction = angle 
-
-        for human in humans:
-            if self.distance_to(human) < 70:
-                angle = math.atan2(self.y - human.y, self.x - human.x)
-                self.direction = angle 
+        self.flee(grid, radius=70)
 
         # Move in the current direction
         self.x += math.cos(self.direction) * self.speed
         self.y += math.sin(self.direction) * self.speed
 
         # Check for boundary collision and adjust direction
-        if self.x <= 0 or self.x >= SCREEN_WIDTH:
+        bounds = self.bounds()
+        if bounds is not None and (self.x <= 0 or self.x >= bounds[0]):
             self.direction = math.pi - self.direction
-        if self.y <= 0 or self.y >= SCREEN_HEIGHT:
+        if bounds is not None and (self.y <= 0 or self.y >= bounds[1]):
             self.direction = -self.direction
 
         # Randomly change direction
-        if random.random() < 0.60:  
-            self.direction += random.uniform(-0.5, 0.5)
+        if self.rng.random() < 0.60:  
+            self.direction += self.rng.uniform(-0.5, 0.5)
 
-        # Ensure the bird stays within screen bounds
-        self.x = max(0, min(self.x, SCREEN_WIDTH))
-        self.y = max(0, min(self.y, SCREEN_HEIGHT))
+        # Ensure the bird stays within world bounds
+        if bounds is not None:
+            self.x = max(0, min(self.x, bounds[0]))
+            self.y = max(0, min(self.y, bounds[1]))
 
         self.hunger-=0.05
 
-    def draw(self):
-        rl.draw_circle(self.x, self.y, 4, rl.YELLOW)
-
-class Raindrop:
-    def __init__(self):
-        self.x = random.randint(0, SCREEN_WIDTH)
-        self.y = random.randint(-SCREEN_HEIGHT, SCREEN_HEIGHT)
-        self.speed = random.uniform(2, 5)
-        self.length = random.uniform(5, 15)
-        self.color = rl.BLUE
-
-    def move(self):
-        self.y += self.speed
-        if self.y > SCREEN_HEIGHT:
-            self.y = random.randint(-SCREEN_HEIGHT, -1)
-            self.x = random.randint(0, SCREEN_WIDTH)
-
-    def draw(self):
-        rl.draw_line(int(self.x), int(self.y), int(self.x), int(self.y + self.length), self.color)
+ENTITY_KINDS = {kind.__name__: kind for kind in (Plant, Animal, Predator, Lion, Tiger, Human, Rabbit, Bird)}
+
+def pack_color(color):
+    # RGBA colour as one uint32 pixel of an R8G8B8A8 image
+    return np.array(color, dtype=np.uint8).view(np.uint32)[0]
+
+def zone_precipitation(zones, weather):
+    # What falls in each zone (by zone id) until the next roll: nothing when sunny, local
+    # showers from Zone.get_weather when cloudy, and rain or snow everywhere when rainy
+    kinds = np.zeros(len(zones), dtype=np.uint8)
+    for zone_id, zone in enumerate(zones):
+        kind = CLEAR
+        if weather != SUNNY:
+            kind = PRECIPITATION[zone.get_weather()]
+            if weather == RAINY and kind == CLEAR:
+                kind = SNOW if zone.temperature_range[1] <= SNOW_TEMPERATURE else RAIN
+        kinds[zone_id] = kind
+    return kinds
+
+class Precipitation:
+    # Rain and snow as particles in preallocated arrays, moved in one vectorized step and drawn
+    # by writing them into a single texture. They are only for show: the simulation decides
+    # which zones rain or snow, and the window keeps the particles. Positions are relative to
+    # the view, and a particle only falls as rain or snow over a cell whose zone is raining or
+    # snowing.
+    FALL = np.array([1, 1, SNOW_SPEED], dtype=np.float32)  # Fall speed factor by kind
+    DRIFT = np.array([0, 0, 1], dtype=np.float32)  # Sideways drift factor by kind
+    MAX_LENGTH = 15  # Longest raindrop streak in pixels
+
+    def __init__(self, count=PARTICLE_COUNT, rng=None):
+        self.rng = rng if rng is not None else RngService().stream("weather")
+        generator = self.rng.generator
+        self.x = generator.uniform(0, SCREEN_WIDTH, count).astype(np.float32)
+        self.y = generator.uniform(0, SCREEN_HEIGHT, count).astype(np.float32)
+        self.speed = generator.uniform(2, 5, count).astype(np.float32)
+        self.length = generator.integers(5, self.MAX_LENGTH + 1, count).astype(np.int32)  # Raindrop streaks
+        self.drift = generator.uniform(-0.5, 0.5, count).astype(np.float32)  # Snowflakes only
+        self.kind = np.zeros(count, dtype=np.uint8)  # What each particle is over its cell
+        self.zone_weather = np.zeros(256, dtype=np.uint8)  # Precipitation kind by zone id
+        # The texture's pixels, with spare rows below the screen for streaks running off the
+        # bottom, and the pixels the last frame drew so the next one only clears those
+        self.pixels = np.zeros((SCREEN_HEIGHT + self.MAX_LENGTH + 1, SCREEN_WIDTH), dtype=np.uint32)
+        self.drawn = np.zeros(0, dtype=np.int64)
+        self.texture = None
+
+    def step(self, game_map, view):
+        if not self.zone_weather.any():
+            self.kind.fill(CLEAR)
+            return
+        self.y += self.speed * self.FALL[self.kind]
+        self.x += self.drift * self.DRIFT[self.kind]
+        np.mod(self.x, SCREEN_WIDTH, out=self.x)
+
+        # Particles that fell out of the bottom start again at the top
+        landed = np.flatnonzero(self.y >= SCREEN_HEIGHT)
+        if len(landed):
+            self.y[landed] -= SCREEN_HEIGHT
+            self.x[landed] = self.rng.generator.uniform(0, SCREEN_WIDTH, len(landed))
+
+        # Look the zones under the particles up in a window of the cells the view covers
+        cell_width, cell_height = game_map.cell_width, game_map.cell_height
+        left, top = int(view[0] // cell_width), int(view[1] // cell_height)
+        columns = int((view[0] + SCREEN_WIDTH) // cell_width) - left + 1
+        rows = int((view[1] + SCREEN_HEIGHT) // cell_height) - top + 1
+        window = self.zone_weather[game_map.zone_window(left, top, columns, rows)]
+        cell_x = ((self.x + np.float32(view[0] - left * cell_width)) * np.float32(1 / cell_width)).astype(np.int32)
+        cell_y = ((self.y + np.float32(view[1] - top * cell_height)) * np.float32(1 / cell_height)).astype(np.int32)
+        self.kind = window[np.minimum(cell_y, rows - 1), np.minimum(cell_x, columns - 1)]
+
+    def draw(self, view):
+        # Only the pixels of the particles are touched: last frame's are cleared, this frame's set
+        if not self.kind.any() and not len(self.drawn):
+            return
+        if self.texture is None:
+            image = rl.gen_image_color(SCREEN_WIDTH, SCREEN_HEIGHT, rl.BLANK)
+            self.texture = rl.load_texture_from_image(image)
+            rl.unload_image(image)
+        pixels = self.pixels.ravel()
+        pixels[self.drawn] = 0
+        heads = self.y.astype(np.int64) * SCREEN_WIDTH + np.minimum(self.x.astype(np.int64), SCREEN_WIDTH - 2)
+
+        # Raindrops are vertical streaks running down from their heads
+        rain = np.flatnonzero(self.kind == RAIN)
+        lengths = self.length[rain]
+        ends = np.cumsum(lengths)
+        row = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths, lengths)
+        streaks = np.repeat(heads[rain], lengths) + row * SCREEN_WIDTH
+        pixels[streaks] = pack_color(RAINDROP_COLOR)
+
+        # Snowflakes are 2x2 dots
+        snow = heads[self.kind == SNOW]
+        flakes = (snow[:, None] + np.array([0, 1, SCREEN_WIDTH, SCREEN_WIDTH + 1])).ravel()
+        pixels[flakes] = pack_color(SNOW_COLOR)
+        self.drawn = np.concatenate([streaks, flakes])
+
+        rl.update_texture(self.texture, self.pixels.ctypes.data)  # The first SCREEN_HEIGHT rows
+        rl.draw_texture(self.texture, int(view[0]), int(view[1]), rl.WHITE)
+
+    def unload(self):
+        if self.texture is not None:
+            rl.unload_texture(self.texture)
+            self.texture = None
 
 class Zone:
     def __init__(self, name, temperature_range, humidity_range,color):
@@ -572,306 +1365,2684 @@ class Zone:
         self.temperature_range = temperature_range
         self.humidity_range = humidity_range
         self.color = color
+        self.rng = random  # A Simulation points this at its weather stream
     
     def get_color(self):
         return self.color
 
     def get_temperature(self):
-        return random.uniform(self.temperature_range[0], self.temperature_range[1])
+        return self.rng.uniform(self.temperature_range[0], self.temperature_range[1])
 
     def get_humidity(self):
-        return random.uniform(self.humidity_range[0], self.humidity_range[1])
+        return self.rng.uniform(self.humidity_range[0], self.humidity_range[1])
 
     def get_weather(self):
         # Simple weather effects based on the zone
         weather = "clear"
         if self.name == "Desert":
-            if random.random() < 0.05:
+            if self.rng.random() < 0.05:
                 weather = "rain"
         elif self.name == "Grassland":
-            if random.random() < 0.2:
+            if self.rng.random() < 0.2:
                 weather = "rain"
         elif self.name == "Forest":
-            if random.random() < 0.3:
+            if self.rng.random() < 0.3:
                 weather = "rain"
         elif self.name == "Tundra":
-            if random.random() < 0.2:
+            if self.rng.random() < 0.2:
                 weather = "snow"
         return weather
     
+def make_zones():
+    # Define zone types and their attributes; maps store an index into this list per cell
+    return [
+        Zone("Desert", (30, 50), (0, 20), DESERT_COLOR),
+        Zone("Grassland", (15, 30), (20, 60), GRASSLAND_COLOR),
+        Zone("Forest", (5, 15), (60, 100), FOREST_COLOR),
+        Zone("Tundra", (-10, 5), (20, 50), TUNDRA_COLOR)
+    ]
+
+def majority_filter(zone_ids, zone_count):
+    # One smoothing pass: every cell takes the most common zone in the 6x6 window from one
+    # cell up/left to four cells down/right, clipped at the array edges. Window counts come
+    # from one summed-area table per zone, so a pass is a few array ops.
+    h, w = zone_ids.shape
+    counts = np.empty((zone_count, h, w), dtype=np.int32)
+    table = np.zeros((h + 6, w + 6), dtype=np.int32)
+    for zone_id in range(zone_count):
+        # Pad one row/column before and four after so edge windows just count zeros
+        padded = np.zeros((h + 5, w + 5), dtype=np.int32)
+        padded[1:h + 1, 1:w + 1] = zone_ids == zone_id
+        np.cumsum(np.cumsum(padded, axis=0, out=padded), axis=1, out=table[1:, 1:])
+        counts[zone_id] = table[6:, 6:] - table[:h, 6:] - table[6:, :w] + table[:h, :w]
+    # Choose the most common zone in the surrounding cells
+    return counts.argmax(axis=0).astype(np.uint8)
+
+def hash_cells(seed, xs, ys):
+    # SplitMix64 of (seed, x, y) for whole coordinate arrays, the same value every time
+    z = (np.asarray(xs).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+         ^ np.asarray(ys).astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+         ^ np.uint64(seed & 0xFFFFFFFFFFFFFFFF))
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def draw_climate(zones, zone_ids, seed, xs, ys, weather):
+    # Temperature and humidity of cells, drawn within each cell's zone ranges from a hash of the
+    # seed and the cell, so any cell can be drawn on its own, then shifted by the weather
+    low_temperature = np.array([zone.temperature_range[0] for zone in zones], dtype=np.float64)
+    high_temperature = np.array([zone.temperature_range[1] for zone in zones], dtype=np.float64)
+    low_humidity = np.array([zone.humidity_range[0] for zone in zones], dtype=np.float64)
+    high_humidity = np.array([zone.humidity_range[1] for zone in zones], dtype=np.float64)
+    bits = hash_cells(seed, xs, ys)
+    first = (bits & np.uint64(0xFFFFFFFF)) / 2.0 ** 32
+    second = (bits >> np.uint64(32)) / 2.0 ** 32
+    temperature_shift, humidity_shift = WEATHER_CLIMATE[weather]
+    temperature = (low_temperature[zone_ids] + (high_temperature - low_temperature)[zone_ids] * first
+                   + temperature_shift)
+    humidity = np.clip(low_humidity[zone_ids] + (high_humidity - low_humidity)[zone_ids] * second
+                       + humidity_shift, 0, 100)
+    return temperature.astype(np.float32), humidity.astype(np.float32)
+
+def climate_seed(seed, epoch):
+    # Seed for one climate tick's draws
+    return int(hash_cells(seed, [epoch], [0x436C696D])[0])
+
 class Map:
-    def __init__(self, width, height, zone_size):
+    # A width x height grid of zone cells. Cells are sized to fill the screen, but never below a
+    # pixel, so a map with more cells than the screen has pixels spans more than one screen.
+    def __init__(self, width, height, zone_size, seed=None, time_budget=None, zone_ids=None):
+        if width < 1 or height < 1:
+            raise ValueError(f"a map needs at least one cell each way, not {width}x{height}")
         self.width = width
         self.height = height
         self.zone_size = zone_size
-        self.grid = [[None for _ in range(width)] for _ in range(height)]
-        self.assign_zones()
-        self.smooth_zones()
+        self.cell_width = max(SCREEN_WIDTH // width, 1)
+        self.cell_height = max(SCREEN_HEIGHT // height, 1)
+        self.pixel_width = width * self.cell_width  # Extent of the world in pixels
+        self.pixel_height = height * self.cell_height
+        self.version = 0  # Bumped whenever a zone changes so cached layers know to redraw
+        self.rng = np.random.default_rng(seed)
+        self.zones = make_zones()
+        self.zone_ids = np.zeros((height, width), dtype=np.uint8)
+
+        started = time.perf_counter()
+        if zone_ids is None:
+            self.assign_zones()
+            self.smooth_zones(time_budget=time_budget)
+        else:
+            self.zone_ids[:] = zone_ids  # Restoring a saved map, nothing to generate
+        self.generation_time = time.perf_counter() - started  # Seconds spent generating zones
+
+        # Per-cell climate fields, redrawn every climate tick and when the weather changes
+        self.fertile = [zone.name in FERTILE_ZONES for zone in self.zones]  # By zone id
+        self.climate_seed = int(self.rng.integers(2 ** 63))
+        self.refresh_climate(0, SUNNY)
 
     def assign_zones(self):
-        # Define zone types and their attributes
-        zones = [
-            Zone("Desert", (30, 50), (0, 20), DESERT_COLOR),
-            Zone("Grassland", (15, 30), (20, 60), GRASSLAND_COLOR),
-            Zone("Forest", (5, 15), (60, 100), FOREST_COLOR),
-            Zone("Tundra", (-10, 5), (20, 50), TUNDRA_COLOR)
-        ]
-        
         # Initial random assignment of zones
-        for y in range(self.height):
-            for x in range(self.width):
-                self.grid[y][x] = random.choice(zones)
-
-    def smooth_zones(self):
-        # Smooth the map to ensure contiguous zones
-        for _ in range(5):  # Number of smoothing iterations
-            new_grid = [[None for _ in range(self.width)] for _ in range(self.height)]
-            for y in range(self.height):
-                for x in range(self.width):
-                    # Count the occurrences of each zone in the surrounding cells
-                    zone_counts = {}
-                    for dy in range(-1, 5):
-                        for dx in range(-1, 5):
-                            ny, nx = y + dy, x + dx
-                            if 0 <= ny < self.height and 0 <= nx < self.width:
-                                zone = self.grid[ny][nx]
-                                if zone not in zone_counts:
-                                    zone_counts[zone] = 0
-                                zone_counts[zone] += 1
-                    # Choose the most common zone in the surrounding cells
-                    most_common_zone = max(zone_counts, key=zone_counts.get)
-                    new_grid[y][x] = most_common_zone
-            self.grid = new_grid
+        self.zone_ids = self.rng.integers(0, len(self.zones), (self.height, self.width), dtype=np.uint8)
+        self.version += 1
+
+    def smooth_zones(self, passes=5, time_budget=None):
+        # Smooth the map to ensure contiguous zones. With a time_budget (seconds) the
+        # remaining passes are skipped once it runs out.
+        started = time.perf_counter()
+        for done in range(passes):
+            if done and time_budget is not None and time.perf_counter() - started > time_budget:
+                break
+            self.zone_ids = majority_filter(self.zone_ids, len(self.zones))
+        self.version += 1
 
     def get_zone(self, x, y):
-        return self.grid[y][x]
-    
+        return self.zones[self.zone_ids[y, x]]
+
+    def get_zone_id(self, x, y):
+        return self.zone_ids.item(y, x)
+
+    def set_zone(self, x, y, zone):
+        self.zone_ids[y, x] = self.zones.index(zone)
+        self.version += 1
+        temperature, humidity = draw_climate(self.zones, self.zone_ids[y, x:x + 1], climate_seed(self.climate_seed, self.epoch),
+                                             [x], [y], self.weather)
+        self.temperature[y, x], self.humidity[y, x] = temperature[0], humidity[0]
+
+    def clamp_cell(self, x, y):
+        return min(max(x, 0), self.width - 1), min(max(y, 0), self.height - 1)
+
+    def refresh_climate(self, epoch, weather):
+        # Draw the temperature and humidity fields for a climate tick (epoch) and weather
+        self.epoch, self.weather = epoch, weather
+        ys, xs = np.mgrid[0:self.height, 0:self.width]
+        self.temperature, self.humidity = draw_climate(self.zones, self.zone_ids, climate_seed(self.climate_seed, epoch),
+                                                       xs, ys, weather)
+
+    def climate_at(self, x, y):
+        return self.temperature.item(y, x), self.humidity.item(y, x)
+
+    def zone_window(self, left, top, columns, rows):
+        # Zone ids of a rectangle of cells, edge cells repeated past the map's edges
+        xs = np.clip(np.arange(left, left + columns), 0, self.width - 1)
+        ys = np.clip(np.arange(top, top + rows), 0, self.height - 1)
+        return self.zone_ids[np.ix_(ys, xs)]
+
+    def climate_window(self, left, top, columns, rows):
+        # Temperature and humidity fields of a rectangle of cells, like zone_window
+        xs = np.clip(np.arange(left, left + columns), 0, self.width - 1)
+        ys = np.clip(np.arange(top, top + rows), 0, self.height - 1)
+        return self.temperature[np.ix_(ys, xs)], self.humidity[np.ix_(ys, xs)]
+
     def get_sunlight_and_humidity(self, x, y):
-        zone = self.get_zone(x, y)
-        sunlight = zone.get_temperature() 
-        humidity = zone.get_humidity()  
-        return sunlight, humidity
+        return self.climate_at(x, y)
+
+class ChunkedMap:
+    # Effectively infinite zone map split into square chunks of cells. A chunk is generated on
+    # first access from the seed and its coordinates alone, so it can be dropped at any time
+    # and regenerated identically; only the most recently used chunks are kept in memory.
+    def __init__(self, seed=0, chunk_size=CHUNK_SIZE, cell_width=16, cell_height=9,
+                 memory_cap=CHUNK_MEMORY_CAP, smoothing_passes=5):
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.memory_cap = memory_cap
+        self.smoothing_passes = smoothing_passes
+        self.version = 0
+        self.zones = make_zones()
+        self.chunks = OrderedDict()  # (chunk_x, chunk_y) -> zone ids, least recently used first
+        self.memory_used = 0
+        self.edits = {}  # (chunk_x, chunk_y) -> {(local_x, local_y): zone id} from set_zone
+        self.fertile = [zone.name in FERTILE_ZONES for zone in self.zones]  # By zone id
+        self.climates = {}  # (chunk_x, chunk_y) -> (temperature, humidity) fields, drawn on first use
+        self.epoch, self.weather = 0, SUNNY
+
+    def chunk_of_cell(self, x, y):
+        return x // self.chunk_size, y // self.chunk_size
+
+    def chunk_of_pixel(self, x, y):
+        return self.chunk_of_cell(int(x // self.cell_width), int(y // self.cell_height))
+
+    def chunk(self, chunk_x, chunk_y):
+        key = (chunk_x, chunk_y)
+        zone_ids = self.chunks.get(key)
+        if zone_ids is None:
+            zone_ids = self.generate_chunk(chunk_x, chunk_y)
+            self.chunks[key] = zone_ids
+            self.memory_used += zone_ids.nbytes
+            # Evict least recently used chunks, they regenerate on demand
+            while self.memory_used > self.memory_cap and len(self.chunks) > 1:
+                _, evicted = self.chunks.popitem(last=False)
+                self.memory_used -= evicted.nbytes
+        else:
+            self.chunks.move_to_end(key)
+        return zone_ids
+
+    def generate_chunk(self, chunk_x, chunk_y):
+        # Each smoothing pass reads one cell up/left and four down/right, so generating the chunk
+        # with that much margin per pass gives exactly the cells a whole-world pass would
+        passes, size = self.smoothing_passes, self.chunk_size
+        x0, y0 = chunk_x * size - passes, chunk_y * size - passes
+        extent = size + 5 * passes
+        ys, xs = np.mgrid[y0:y0 + extent, x0:x0 + extent]
+        zone_ids = (hash_cells(self.seed, xs, ys) % np.uint64(len(self.zones))).astype(np.uint8)
+        for _ in range(passes):
+            zone_ids = majority_filter(zone_ids, len(self.zones))
+        zone_ids = zone_ids[passes:passes + size, passes:passes + size].copy()
+        for (local_x, local_y), zone_id in self.edits.get((chunk_x, chunk_y), {}).items():
+            zone_ids[local_y, local_x] = zone_id
+        return zone_ids
 
-def draw_map(game_map):
-    screen_width = SCREEN_WIDTH
-    screen_height = SCREEN_HEIGHT
-    cell_width = screen_width // game_map.width
-    cell_height = screen_height // game_map.height
+    def get_zone(self, x, y):
+        zone_ids = self.chunk(x // self.chunk_size, y // self.chunk_size)
+        return self.zones[zone_ids[y % self.chunk_size, x % self.chunk_size]]
+
+    def get_zone_id(self, x, y):
+        return self.chunk(x // self.chunk_size, y // self.chunk_size).item(y % self.chunk_size, x % self.chunk_size)
+
+    def set_zone(self, x, y, zone):
+        key, local = self.chunk_of_cell(x, y), (x % self.chunk_size, y % self.chunk_size)
+        zone_id = self.zones.index(zone)
+        self.edits.setdefault(key, {})[local] = zone_id
+        if key in self.chunks:
+            self.chunks[key][local[1], local[0]] = zone_id
+        self.climates.pop(key, None)
+        self.version += 1
+
+    def clamp_cell(self, x, y):
+        return x, y  # No edges to clamp against
+
+    def refresh_climate(self, epoch, weather):
+        # Chunks draw their fields for the new climate tick when next used
+        self.epoch, self.weather = epoch, weather
+        self.climates.clear()
+
+    def chunk_climate(self, chunk_x, chunk_y):
+        key = (chunk_x, chunk_y)
+        fields = self.climates.get(key)
+        if fields is None:
+            size = self.chunk_size
+            ys, xs = np.mgrid[chunk_y * size:(chunk_y + 1) * size, chunk_x * size:(chunk_x + 1) * size]
+            fields = draw_climate(self.zones, self.chunk(*key), climate_seed(self.seed, self.epoch), xs, ys, self.weather)
+            self.climates[key] = fields
+        return fields
+
+    def climate_at(self, x, y):
+        temperature, humidity = self.chunk_climate(x // self.chunk_size, y // self.chunk_size)
+        local_x, local_y = x % self.chunk_size, y % self.chunk_size
+        return temperature.item(local_y, local_x), humidity.item(local_y, local_x)
+
+    def zone_window(self, left, top, columns, rows):
+        # Zone ids of a rectangle of cells, copied from every chunk it overlaps
+        window = np.empty((rows, columns), dtype=np.uint8)
+        size = self.chunk_size
+        for chunk_y in range(top // size, (top + rows - 1) // size + 1):
+            for chunk_x in range(left // size, (left + columns - 1) // size + 1):
+                x0, x1 = max(left, chunk_x * size), min(left + columns, (chunk_x + 1) * size)
+                y0, y1 = max(top, chunk_y * size), min(top + rows, (chunk_y + 1) * size)
+                zone_ids = self.chunk(chunk_x, chunk_y)
+                window[y0 - top:y1 - top, x0 - left:x1 - left] = \
+                    zone_ids[y0 - chunk_y * size:y1 - chunk_y * size, x0 - chunk_x * size:x1 - chunk_x * size]
+        return window
+
+    def climate_window(self, left, top, columns, rows):
+        # Temperature and humidity fields of a rectangle of cells, like zone_window
+        temperature = np.empty((rows, columns), dtype=np.float32)
+        humidity = np.empty((rows, columns), dtype=np.float32)
+        size = self.chunk_size
+        for chunk_y in range(top // size, (top + rows - 1) // size + 1):
+            for chunk_x in range(left // size, (left + columns - 1) // size + 1):
+                x0, x1 = max(left, chunk_x * size), min(left + columns, (chunk_x + 1) * size)
+                y0, y1 = max(top, chunk_y * size), min(top + rows, (chunk_y + 1) * size)
+                source = (slice(y0 - chunk_y * size, y1 - chunk_y * size), slice(x0 - chunk_x * size, x1 - chunk_x * size))
+                fields = self.chunk_climate(chunk_x, chunk_y)
+                temperature[y0 - top:y1 - top, x0 - left:x1 - left] = fields[0][source]
+                humidity[y0 - top:y1 - top, x0 - left:x1 - left] = fields[1][source]
+        return temperature, humidity
 
-    for y in range(game_map.height):
-        for x in range(game_map.width):
-            zone = game_map.get_zone(x, y)
-            color = zone.get_color() if zone else rl.DARKGRAY
-            rl.draw_rectangle(x * cell_width, y * cell_height, cell_width, cell_height, color)
+    def get_sunlight_and_humidity(self, x, y):
+        return self.climate_at(x, y)
 
-# Initialize the simulation
-def main():
-    rl.init_window(SCREEN_WIDTH, SCREEN_HEIGHT, b"Open World Simulation")
-    rl.set_target_fps(60)
+    def chunks_around(self, x, y, radius):
+        # Chunk keys in the square of chunks within radius of the chunk holding pixel (x, y)
+        center_x, center_y = self.chunk_of_pixel(x, y)
+        return {(center_x + dx, center_y + dy)
+                for dy in range(-radius, radius + 1) for dx in range(-radius, radius + 1)}
 
-    plants = []
-    animals = []
-    predators = []
-    tigers=[]
-    lions=[]
-    humans = []
-    rabbits = []
-    birds = []
+def pack_animals(kind, entities):
+    # Column arrays for a list of animals of one kind, for parking on disk or snapshots
+    return {name: np.array([getattr(entity, name) for entity in entities])
+            for name in STORE_COLUMNS + kind.SAVED_FIELDS}
 
-    sunlight = 50
-    humidity = 50
-    weather = SUNNY
+def unpack_animals(kind, arrays):
+    animals = []
+    for i in range(len(arrays["x"])):
+        animal = kind.__new__(kind)  # Restore the saved state without rolling new attributes
+        animal._store, animal._row, animal.alive = None, -1, True
+        animal._detached = {name: arrays[name][i].item() for name in STORE_COLUMNS}
+        for name in kind.SAVED_FIELDS:
+            setattr(animal, name, arrays[name][i].item())
+        animals.append(animal)
+    return animals
+
+def pack_plants(plants, vegetation=None):
+    # Column arrays for a list of plants and their cells, read from vegetation for plants
+    # that live in it
+    owned = vegetation.cells_by_owner() if vegetation is not None else {}
+    cells = [plant.cells if plant.cells is not None else owned.get(plant.id, np.zeros((0, 3), dtype=np.int64))
+             for plant in plants]
+    return {
+        "id": np.array([plant.id for plant in plants], dtype=np.int64),
+        "x": np.array([plant.x for plant in plants], dtype=np.int64),
+        "y": np.array([plant.y for plant in plants], dtype=np.int64),
+        "health": np.array([plant.health for plant in plants], dtype=np.float64),
+        "cell_counts": np.array([len(rows) for rows in cells], dtype=np.int64),
+        "cells": np.concatenate(cells).astype(np.int64) if cells else np.zeros((0, 3), dtype=np.int64),
+    }
+
+def unpack_plants(arrays, game_map):
+    plants = []
+    ends = np.cumsum(arrays["cell_counts"])
+    for i in range(len(arrays["x"])):
+        plant = Plant.__new__(Plant)
+        plant._store, plant._row, plant.id, plant.alive = None, -1, arrays["id"][i].item(), True
+        plant.x, plant.y = arrays["x"][i].item(), arrays["y"][i].item()
+        plant.health = arrays["health"][i].item()
+        plant.cells = arrays["cells"][ends[i] - arrays["cell_counts"][i]:ends[i]]
+        plant.game_map = game_map
+        plant.update_zone()
+        plants.append(plant)
+    return plants
+
+class ChunkArchive:
+    # Plants and dormant animals of inactive chunks, parked on disk as one compressed file per chunk
+    # Without a directory the chunks go to a temporary one, deleted by close() or at exit.
+    def __init__(self, directory=None):
+        self.temporary = None if directory else tempfile.TemporaryDirectory(prefix="open_world_chunks_")
+        self.directory = directory or self.temporary.name
+        os.makedirs(self.directory, exist_ok=True)
+
+    def close(self):
+        if self.temporary is not None:
+            self.temporary.cleanup()
+            self.temporary = None
+
+    def path(self, key):
+        return os.path.join(self.directory, f"chunk_{key[0]}_{key[1]}.npz")
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def keys(self):
+        keys = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith("chunk_") and name.endswith(".npz"):
+                chunk_x, chunk_y = name[len("chunk_"):-len(".npz")].split("_")
+                keys.append((int(chunk_x), int(chunk_y)))
+        return keys
+
+    def read(self, key):
+        # Raw packed arrays of a parked chunk, left in place
+        with np.load(self.path(key)) as data:
+            return {name: data[name] for name in data.files}
+
+    def write(self, key, arrays):
+        np.savez_compressed(self.path(key), **arrays)
+
+    def save(self, key, populations, game_map):
+        # Merge with whatever is already parked in this chunk
+        if key in self:
+            for kind, entities in self.load(key, game_map).items():
+                populations.setdefault(kind, []).extend(entities)
+        arrays = {}
+        for kind, entities in populations.items():
+            if not entities:
+                continue
+            packed = pack_plants(entities) if kind is Plant else pack_animals(kind, entities)
+            for name, values in packed.items():
+                arrays[f"{kind.__name__}.{name}"] = values
+        self.write(key, arrays)
+
+    def load(self, key, game_map):
+        # Unpark a chunk; the file is removed since its entities are live again
+        populations = {}
+        with np.load(self.path(key)) as data:
+            grouped = {}
+            for name in data.files:
+                kind_name, field = name.split(".", 1)
+                grouped.setdefault(kind_name, {})[field] = data[name]
+        for kind_name, arrays in grouped.items():
+            kind = ENTITY_KINDS[kind_name]
+            populations[kind] = unpack_plants(arrays, game_map) if kind is Plant else unpack_animals(kind, arrays)
+        os.remove(self.path(key))
+        return populations
+
+# Snapshot file layout: magic, format version and header length, a JSON header describing
+# every column, then the raw column bytes, each starting on a SNAPSHOT_ALIGN boundary
+SNAPSHOT_MAGIC = b"OWSNAP\0\0"
+SNAPSHOT_VERSION = 9  # Bump when the snapshot layout changes
+SNAPSHOT_ALIGN = 64
+
+def write_snapshot(path, meta, columns):
+    # Write to a temporary file first so a crash mid-write never leaves a torn snapshot behind
+    layout, offset = {}, 0
+    arrays = {}
+    for name, values in columns.items():
+        values = np.ascontiguousarray(values)
+        if values.nbytes:
+            offset = -(-offset // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+        layout[name] = {"dtype": values.dtype.str, "shape": list(values.shape), "offset": offset}
+        arrays[name] = values
+        offset += values.nbytes
+    header = json.dumps({"meta": meta, "columns": layout}).encode()
+    prefix = len(SNAPSHOT_MAGIC) + 8
+    data_start = -(-(prefix + len(header)) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+    partial = f"{path}.partial"
+    with open(partial, "wb") as out:
+        out.write(SNAPSHOT_MAGIC + struct.pack("<II", SNAPSHOT_VERSION, len(header)) + header)
+        for name, values in arrays.items():
+            out.seek(data_start + layout[name]["offset"])
+            out.write(values.tobytes())
+        out.truncate(data_start + offset)
+    os.replace(partial, path)
+
+def read_snapshot(path):
+    # Returns (meta, columns); the columns are read-only views onto a memory map of the file,
+    # so nothing is read from disk until a column is actually used
+    with open(path, "rb") as snapshot:
+        prefix = snapshot.read(len(SNAPSHOT_MAGIC) + 8)
+        if prefix[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a world snapshot")
+        version, header_length = struct.unpack("<II", prefix[len(SNAPSHOT_MAGIC):])
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is snapshot version {version}, expected {SNAPSHOT_VERSION}")
+        header = json.loads(snapshot.read(header_length))
+    data_start = -(-(len(prefix) + header_length) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+    mapped = np.memmap(path, dtype=np.uint8, mode="r")
+    columns = {name: np.ndarray(tuple(column["shape"]), dtype=np.dtype(column["dtype"]), buffer=mapped,
+                                offset=data_start + column["offset"])
+               for name, column in header["columns"].items()}
+    return header["meta"], columns
+
+class Checkpointer:
+    # Periodic snapshots while the simulation runs. The state is copied on the tick thread,
+    # which is only array copies, and the file is written by a background thread; if the
+    # previous checkpoint is still being written the next one is skipped rather than waited on.
+    def __init__(self, path, interval=500):
+        self.path = path  # May contain {tick}, otherwise the same file is rewritten each time
+        self.interval = interval
+        self.thread = None
+        self.error = None
+        self.written = 0
+
+    def after_tick(self, sim):
+        if sim.tick % self.interval or (self.thread is not None and self.thread.is_alive()):
+            return
+        meta, columns = sim.snapshot()
+        path = self.path.format(tick=sim.tick)
+        self.thread = threading.Thread(target=self.write, args=(path, meta, columns), daemon=True)
+        self.thread.start()
+
+    def write(self, path, meta, columns):
+        try:
+            write_snapshot(path, meta, columns)
+            self.written += 1
+        except OSError as error:
+            self.error = error  # Reported by close(), a failed checkpoint must not kill the run
+
+    def close(self):
+        if self.thread is not None:
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+# Event log layout: magic and format version, then records appended tick by tick, each a
+# (type, tick, payload length) header followed by its payload
+EVENT_MAGIC = b"OWLOG\0\0\0"
+EVENT_VERSION = 3  # Bump when a record layout changes
+EVENT_HEADER = struct.Struct("<BII")
+EVENT_MAP, EVENT_FRAME, EVENT_SPAWN, EVENT_KILL, EVENT_VEGETATION, EVENT_EATEN, EVENT_WEATHER, EVENT_INPUT = range(8)
+EVENT_SPAWN_RECORD = struct.Struct("<QBdd4B")  # id, kind, x, y, marker colour
+EVENT_KILL_RECORD = struct.Struct("<QQ")  # id, killer id or 0
+EVENT_EATEN_RECORD = struct.Struct("<QQd")  # plant id, eater id or 0 when wilting, plant health left
+# Vegetation records are int64 rows of (plant id, cell x, cell y, biomass), biomass 0 for a bare cell
+EVENT_WEATHER_RECORD = struct.Struct("<Bdd")  # weather, sunlight, humidity, then each zone's precipitation
+EVENT_INPUT_RECORD = struct.Struct("<dd")  # world position, followed by the input's label
+LOG_KINDS = tuple(ENTITY_KINDS.values())  # Kind numbers used in spawn records
+
+# Statistics file layout: magic and format version, then blocks of rows, each a payload
+# length followed by the block's columns as compressed arrays
+STATS_MAGIC = b"OWSTATS\0"
+STATS_VERSION = 1
+
+def encode_arrays(arrays):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+def decode_arrays(payload):
+    with np.load(io.BytesIO(payload)) as data:
+        return {name: data[name] for name in data.files}
+
+def pack_map(game_map):
+    # Arrays that rebuild the zones of a map: the whole zone grid, or a chunked map's settings and edits
+    if not isinstance(game_map, ChunkedMap):
+        return {"zone_ids": game_map.zone_ids, "size": np.array([game_map.width, game_map.height])}
+    edits = [(chunk_x, chunk_y, local_x, local_y, zone_id)
+             for (chunk_x, chunk_y), cells in game_map.edits.items()
+             for (local_x, local_y), zone_id in cells.items()]
+    return {"chunked": np.array([game_map.seed, game_map.chunk_size, game_map.cell_width,
+                                 game_map.cell_height, game_map.smoothing_passes]),
+            "edits": np.array(edits, dtype=np.int64).reshape(-1, 5)}
+
+def unpack_map(arrays):
+    if "zone_ids" in arrays:
+        width, height = arrays["size"].tolist()
+        return Map(width, height, 1, zone_ids=arrays["zone_ids"])
+    seed, chunk_size, cell_width, cell_height, passes = arrays["chunked"].tolist()
+    game_map = ChunkedMap(seed, chunk_size, cell_width, cell_height, smoothing_passes=passes)
+    for chunk_x, chunk_y, local_x, local_y, zone_id in arrays["edits"].tolist():
+        game_map.edits.setdefault((chunk_x, chunk_y), {})[(local_x, local_y)] = zone_id
+    return game_map
+
+class EventLog:
+    # Append-only record of a run: the map, a keyframe of every position every keyframe_interval
+    # ticks, and in between the events that change the world - births, deaths with their killer,
+    # vegetation cells growing and being grazed, weather changes and user input. Replay rebuilds the run from it.
+    def __init__(self, path, keyframe_interval=EVENT_KEYFRAME_INTERVAL):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.tick = 0  # Tick the events being written belong to
+        self.file = open(path, "wb")
+        self.file.write(EVENT_MAGIC + struct.pack("<I", EVENT_VERSION))
+
+    def write(self, kind, payload):
+        self.file.write(EVENT_HEADER.pack(kind, self.tick, len(payload)))
+        self.file.write(payload)
+
+    def start(self, sim):
+        self.tick = sim.tick
+        self.write(EVENT_MAP, encode_arrays(pack_map(sim.game_map)))
+        self.frame(sim)
+
+    def frame(self, sim):
+        arrays = {"world.state": np.array([sim.weather, sim.sunlight, sim.humidity], dtype=np.float64),
+                  "world.view": np.array(sim.view, dtype=np.float64),
+                  "world.precipitation": sim.zone_weather}
+        for kind, group in sim.populations.items():
+            if not len(group):
+                continue
+            if kind is Plant:
+                packed = pack_plants(group, sim.vegetation)
+            else:
+                packed = {
+                    "id": np.array([entity.id for entity in group], dtype=np.int64),
+                    "x": group.column("x").astype(np.float32),
+                    "y": group.column("y").astype(np.float32),
+                    "color": np.array([entity.marker_color() for entity in group], dtype=np.uint8),
+                }
+            for name, values in packed.items():
+                arrays[f"{kind.__name__}.{name}"] = values
+        self.write(EVENT_FRAME, encode_arrays(arrays))
+
+    def spawn(self, entity):
+        color = PLANT_COLOR if isinstance(entity, Plant) else entity.marker_color()
+        self.write(EVENT_SPAWN, EVENT_SPAWN_RECORD.pack(entity.id, LOG_KINDS.index(type(entity)),
+                                                        entity.x, entity.y, *color))
+
+    def kill(self, entity, killer=None):
+        self.write(EVENT_KILL, EVENT_KILL_RECORD.pack(entity.id, killer.id if killer is not None else 0))
+
+    def vegetation(self, cells):
+        self.write(EVENT_VEGETATION, cells.astype(np.int64).tobytes())
+
+    def eaten(self, plant, eater=None):
+        self.write(EVENT_EATEN, EVENT_EATEN_RECORD.pack(plant.id, eater.id if eater is not None else 0, plant.health))
+
+    def weather(self, sim):
+        self.write(EVENT_WEATHER, EVENT_WEATHER_RECORD.pack(sim.weather, sim.sunlight, sim.humidity)
+                   + sim.zone_weather.tobytes())
+
+    def input(self, label, x=0, y=0):
+        self.write(EVENT_INPUT, EVENT_INPUT_RECORD.pack(x, y) + label.encode())
+
+    def end_tick(self, sim):
+        self.tick = sim.tick
+        if self.tick % self.keyframe_interval == 0:
+            self.frame(sim)
+
+    def close(self):
+        self.file.close()
+
+class Replay:
+    # A recorded run rebuilt from its event log alone, without running any behaviour code.
+    # Seeking jumps to the keyframe at or before the tick and applies the events after it;
+    # animals glide between keyframes since their steps in between are not logged.
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        prefix = self.file.read(len(EVENT_MAGIC) + 4)
+        if prefix[:len(EVENT_MAGIC)] != EVENT_MAGIC:
+            raise ValueError(f"{path} is not an event log")
+        version, = struct.unpack("<I", prefix[len(EVENT_MAGIC):])
+        if version != EVENT_VERSION:
+            raise ValueError(f"{path} is event log version {version}, expected {EVENT_VERSION}")
+
+        # One pass over the record headers to find the map, the keyframes and the last tick
+        self.frames = []  # (tick, offset) of each keyframe
+        self.game_map = None
+        self.last_tick = 0
+        offset = len(prefix)
+        for kind, tick, payload, next_offset in self.records(offset, read_payload=False):
+            if kind == EVENT_MAP and self.game_map is None:
+                self.game_map = unpack_map(decode_arrays(self.read_payload(offset)))
+            elif kind == EVENT_FRAME:
+                self.frames.append((tick, offset))
+            # Other records happen during their tick, so the state after it exists too
+            self.last_tick = max(self.last_tick, tick if kind in (EVENT_MAP, EVENT_FRAME) else tick + 1)
+            offset = next_offset
+        self.seek(self.frames[0][0])
+
+    def records(self, offset, read_payload=True):
+        # (type, tick, payload, offset of the next record) from offset to the end of the log
+        self.file.seek(offset)
+        while True:
+            header = self.file.read(EVENT_HEADER.size)
+            if len(header) < EVENT_HEADER.size:
+                return
+            kind, tick, length = EVENT_HEADER.unpack(header)
+            if read_payload:
+                payload = self.file.read(length)
+            else:
+                payload = None
+                self.file.seek(length, os.SEEK_CUR)
+            offset += EVENT_HEADER.size + length
+            yield kind, tick, payload, offset
+
+    def read_payload(self, offset):
+        for _, _, payload, _ in self.records(offset):
+            return payload
+
+    def load_frame(self, index):
+        tick, offset = self.frames[index]
+        for _, _, payload, self.offset in self.records(offset):
+            break  # self.offset now points past the keyframe, at its tick's events
+        arrays = decode_arrays(payload)
+        self.frame_index, self.tick = index, tick
+        self.weather, self.sunlight, self.humidity = arrays["world.state"].tolist()
+        self.weather = int(self.weather)
+        self.precipitation = arrays["world.precipitation"]
+        self.view = tuple(arrays["world.view"].tolist())
+        self.animals = {}  # id -> [kind, x, y, tick of that position, colour]
+        self.plants = {}  # id -> health
+        self.vegetation = {}  # (cell x, cell y) -> [plant id, biomass]
+        for kind in LOG_KINDS:
+            name = kind.__name__
+            if f"{name}.id" not in arrays:
+                continue
+            if kind is Plant:
+                for plant in unpack_plants({field[len(name) + 1:]: values for field, values in arrays.items()
+                                            if field.startswith(name + ".")}, self.game_map):
+                    self.plants[plant.id] = plant.health
+                    for x, y, biomass in plant.cells.tolist():
+                        self.vegetation[(x, y)] = [plant.id, biomass]
+            else:
+                colors = [tuple(color) for color in arrays[f"{name}.color"].tolist()]
+                for entity_id, x, y, color in zip(arrays[f"{name}.id"].tolist(), arrays[f"{name}.x"].tolist(),
+                                                  arrays[f"{name}.y"].tolist(), colors):
+                    self.animals[entity_id] = [kind, x, y, tick, color]
+
+        # Where every animal will be at the next keyframe, to glide towards
+        self.next_tick, self.next_positions = None, {}
+        if index + 1 < len(self.frames):
+            self.next_tick = self.frames[index + 1][0]
+            upcoming = decode_arrays(self.read_payload(self.frames[index + 1][1]))
+            for kind in LOG_KINDS[1:]:
+                name = kind.__name__
+                if f"{name}.id" in upcoming:
+                    self.next_positions.update(zip(upcoming[f"{name}.id"].tolist(),
+                                                   zip(upcoming[f"{name}.x"].tolist(), upcoming[f"{name}.y"].tolist())))
+
+    def seek(self, tick):
+        tick = max(self.frames[0][0], min(tick, self.last_tick))
+        index = bisect.bisect_right([frame_tick for frame_tick, _ in self.frames], tick) - 1
+        self.load_frame(index)
+        self.last_input = None  # Most recent user input, shown by the replay viewer
+        self.advance(tick - self.tick)
+
+    def advance(self, ticks=1):
+        # Apply the records up to the state after self.tick + ticks ticks, jumping to each
+        # keyframe on the way so positions never drift
+        target = min(self.tick + ticks, self.last_tick)
+        while True:
+            reached_frame = False
+            for kind, tick, payload, next_offset in self.records(self.offset):
+                if kind == EVENT_FRAME:
+                    reached_frame = tick <= target
+                    break
+                if tick >= target:
+                    break
+                self.apply(kind, tick, payload)
+                self.offset = next_offset
+            if not reached_frame:
+                break
+            self.load_frame(self.frame_index + 1)
+        self.tick = target
+
+    def apply(self, kind, tick, payload):
+        if kind == EVENT_SPAWN:
+            entity_id, kind_index, x, y, *color = EVENT_SPAWN_RECORD.unpack(payload)
+            spawned = LOG_KINDS[kind_index]
+            if spawned is Plant:
+                self.plants[entity_id] = 100  # Its cells follow in a vegetation record
+            else:
+                self.animals[entity_id] = [spawned, x, y, tick, tuple(color)]
+        elif kind == EVENT_KILL:
+            entity_id, _ = EVENT_KILL_RECORD.unpack(payload)
+            self.animals.pop(entity_id, None)
+            if self.plants.pop(entity_id, None) is not None:
+                # A plant's cells go bare with it
+                self.vegetation = {cell: owned for cell, owned in self.vegetation.items() if owned[0] != entity_id}
+        elif kind == EVENT_VEGETATION:
+            for plant_id, x, y, biomass in np.frombuffer(payload, dtype=np.int64).reshape(-1, 4).tolist():
+                if biomass:
+                    self.vegetation[(x, y)] = [plant_id, biomass]
+                else:
+                    self.vegetation.pop((x, y), None)
+        elif kind == EVENT_EATEN:
+            plant_id, _, health = EVENT_EATEN_RECORD.unpack(payload)
+            if plant_id in self.plants:
+                self.plants[plant_id] = health
+        elif kind == EVENT_WEATHER:
+            self.weather, self.sunlight, self.humidity = EVENT_WEATHER_RECORD.unpack_from(payload)
+            self.precipitation = np.frombuffer(payload, dtype=np.uint8, offset=EVENT_WEATHER_RECORD.size)
+        elif kind == EVENT_INPUT:
+            x, y = EVENT_INPUT_RECORD.unpack_from(payload)
+            self.last_input = (tick, payload[EVENT_INPUT_RECORD.size:].decode(), x, y)
+
+    def positions(self):
+        # Animal markers at the current tick as {(kind, colour): ([xs], [ys])}
+        markers = {}
+        for entity_id, (kind, x, y, tick, color) in self.animals.items():
+            target = self.next_positions.get(entity_id)
+            if target is not None and self.next_tick > tick:
+                progress = (self.tick - tick) / (self.next_tick - tick)
+                x, y = x + (target[0] - x) * progress, y + (target[1] - y) * progress
+            xs, ys = markers.setdefault((kind, color), ([], []))
+            xs.append(x)
+            ys.append(y)
+        return markers
+
+class SpatialGrid:
+    # Uniform hash grid over the rows of each species' EntityStore, by exact type. A species is
+    # binned in one pass: its rows sorted by cell from floor_divide of the x and y columns, with
+    # the slice of them each occupied cell holds. Moves and births only mark the species out of
+    # date, and it is binned again the next time it is searched. Deaths are flagged by row
+    # instead, since rows only change at the flush that ends a tick.
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.clear()
+
+    def clear(self):
+        self.groups = {}  # type -> the EntityStore of its entities
+        self.bins = {}  # type -> (rows sorted by cell, {cell key: (start, end)}, occupied cells, extent)
+        self.gone = {}  # type -> rows removed since the species was binned
+        self.stale = set()  # Types whose entities moved or were born since they were binned
+
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    @staticmethod
+    def key(cell_x, cell_y):
+        # One integer per cell, for Python ints and NumPy arrays alike
+        return (cell_x << 32) | (cell_y & 0xFFFFFFFF)
+
+    def rebuild(self, *groups):
+        self.clear()
+        for group in groups:
+            self.groups[group.kind] = group
+            self.bin(group.kind)
+
+    def removed(self, kind):
+        # The removed-row flags of a species, grown to its current rows
+        rows = len(self.groups[kind])
+        gone = self.gone.get(kind)
+        if gone is None or len(gone) < rows:
+            grown = np.zeros(rows, dtype=bool)
+            if gone is not None:
+                grown[:len(gone)] = gone
+            gone = self.gone[kind] = grown
+        return gone
+
+    def bin(self, kind):
+        group = self.groups[kind]
+        cell_x = np.floor_divide(group.column("x"), self.cell_size).astype(np.int64)
+        cell_y = np.floor_divide(group.column("y"), self.cell_size).astype(np.int64)
+        keys = self.key(cell_x, cell_y)
+        rows = np.flatnonzero(~self.removed(kind)[:len(group)])
+        order = rows[np.argsort(keys[rows], kind="stable")]
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(keys)]
+        occupied_x, occupied_y = cell_x[order[starts]], cell_y[order[starts]]
+        extent = ((occupied_x.min(), occupied_y.min(), occupied_x.max(), occupied_y.max())
+                  if len(starts) else None)
+        cells = dict(zip(keys[starts].tolist(), zip(starts.tolist(), ends.tolist())))
+        self.bins[kind] = (order, cells, (occupied_x, occupied_y), extent)
+        self.stale.discard(kind)
+
+    def binned(self, kind):
+        # The bins of a species, brought up to date first; None for a species not in the grid
+        if kind in self.stale:
+            self.bin(kind)
+        return self.bins.get(kind)
+
+    def insert(self, entity):
+        kind = type(entity)
+        if kind not in self.groups:
+            self.groups[kind] = entity._store
+        self.stale.add(kind)
+
+    def remove(self, entity):
+        kind = type(entity)
+        if kind in self.groups and entity._store is self.groups[kind]:
+            self.removed(kind)[entity._row] = True
+
+    def update(self, entity):
+        # Refile an entity that may have moved into a different cell
+        if type(entity) in self.groups:
+            self.stale.add(type(entity))
+
+    def refile(self, group):
+        # The same for every entity of a group at once
+        if group.kind in self.groups:
+            self.stale.add(group.kind)
+
+    def occupied(self, kinds):
+        # (cell x, cell y) of every cell holding an entity of the given exact types
+        cells = [self.binned(kind)[2] for kind in kinds if kind in self.groups]
+        if not cells:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate([x for x, _ in cells]), np.concatenate([y for _, y in cells])
+
+    def rows_in(self, kind, keys):
+        # Live rows of a species filed under the given cell keys, cell by cell
+        order, cells, _, _ = self.bins[kind]
+        slices = [order[bounds[0]:bounds[1]] for bounds in map(cells.get, keys) if bounds is not None]
+        if not slices:
+            return None
+        rows = np.concatenate(slices) if len(slices) > 1 else slices[0]
+        gone = self.gone[kind]
+        return rows[~gone[rows]]
+
+    def query(self, x, y, radius, kinds):
+        # All entities of the given exact types within radius of (x, y)
+        found = []
+        min_cx, min_cy = self.cell_of(x - radius, y - radius)
+        max_cx, max_cy = self.cell_of(x + radius, y + radius)
+        keys = [self.key(cx, cy) for cy in range(min_cy, max_cy + 1) for cx in range(min_cx, max_cx + 1)]
+        for kind in kinds:
+            if self.binned(kind) is None:
+                continue
+            rows = self.rows_in(kind, keys)
+            if rows is None:
+                continue
+            columns = self.groups[kind].columns
+            rows = rows[np.hypot(columns["x"][rows] - x, columns["y"][rows] - y) < radius]
+            entities = self.groups[kind].entities
+            found.extend(entities[row] for row in rows.tolist())
+        return found
+
+    def nearest(self, x, y, kinds, radius=None):
+        # Closest entity of the given exact types, searching rings of cells outwards
+        best, best_distance = None, float('inf')
+        kinds = [kind for kind in kinds if self.binned(kind) is not None and self.bins[kind][3] is not None]
+        if not kinds:
+            return best, best_distance
+
+        def closest(kind, rows):
+            nonlocal best, best_distance
+            if rows is None or not len(rows):
+                return
+            columns = self.groups[kind].columns
+            distance = np.hypot(columns["x"][rows] - x, columns["y"][rows] - y)
+            i = int(distance.argmin())
+            if distance[i] < best_distance:
+                best, best_distance = self.groups[kind].entities[rows[i]], float(distance[i])
+
+        if sum(len(self.bins[kind][0]) for kind in kinds) <= LINEAR_SCAN_LIMIT:
+            # Sparse population, cheaper to check every row
+            for kind in kinds:
+                order = self.bins[kind][0]
+                closest(kind, order[~self.gone[kind][order]])
+        else:
+            cx, cy = self.cell_of(x, y)
+            extents = [self.bins[kind][3] for kind in kinds]
+            min_x, min_y = min(e[0] for e in extents), min(e[1] for e in extents)
+            max_x, max_y = max(e[2] for e in extents), max(e[3] for e in extents)
+            rings = max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+            if radius is not None:
+                rings = min(rings, int(radius // self.cell_size) + 1)
+            key = self.key
+            for ring in range(rings + 1):
+                keys = []
+                for ny in range(cy - ring, cy + ring + 1):
+                    edge = ny == cy - ring or ny == cy + ring
+                    columns = range(cx - ring, cx + ring + 1) if edge else (cx - ring, cx + ring)
+                    keys.extend(key(nx, ny) for nx in columns)
+                for kind in kinds:
+                    closest(kind, self.rows_in(kind, keys))
+                # Nothing beyond the next ring can be closer than ring * cell_size
+                if best_distance <= ring * self.cell_size:
+                    break
+
+        if radius is not None and best_distance >= radius:
+            return None, float('inf')
+        return best, best_distance
+
+def ring_offsets(ring):
+    # Bucket offsets on the square ring at Chebyshev distance ring
+    if ring == 0:
+        return np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    side = np.arange(-ring, ring + 1, dtype=np.int64)
+    inner = side[1:-1]
+    dx = np.concatenate([side, side, np.full(len(inner), -ring), np.full(len(inner), ring)])
+    dy = np.concatenate([np.full(len(side), -ring), np.full(len(side), ring), inner, inner])
+    return dx, dy
+
+class FoodIndex:
+    # Nearest green cell of a Vegetation raster to many positions at once. The raster keeps
+    # its green cells counted per FOOD_BUCKET_CELLS square as they turn green or bare; a query
+    # searches rings of those buckets outwards for all its positions together, reading the
+    # cells of the buckets that have any straight from the raster.
+    def __init__(self, vegetation, registry):
+        self.vegetation = vegetation
+        self.registry = registry
+        side = np.arange(FOOD_BUCKET_CELLS)
+        self.offset_x = np.tile(side, FOOD_BUCKET_CELLS)  # The cells of a bucket, row by row
+        self.offset_y = np.repeat(side, FOOD_BUCKET_CELLS)
+
+    def nearest(self, x, y):
+        # (plant, x, y) of the centre of the nearest green cell to each position, None when
+        # nothing is green. Like SpatialGrid.nearest, each position drops out once nothing
+        # further out can be closer; ties go to the cell that comes first row by row.
+        vegetation = self.vegetation
+        if not vegetation.counts:
+            return [None] * len(x)
+        buckets, owner = vegetation.buckets, vegetation.owner
+        left, top, columns, rows = vegetation.area
+        cell_width, cell_height = vegetation.game_map.cell_width, vegetation.game_map.cell_height
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        bucket_x = np.floor((x / cell_width - left) / FOOD_BUCKET_CELLS).astype(np.int64)
+        bucket_y = np.floor((y / cell_height - top) / FOOD_BUCKET_CELLS).astype(np.int64)
+        bucket_rows, bucket_columns = buckets.shape
+        rings = np.maximum.reduce([np.abs(bucket_x), np.abs(bucket_x - bucket_columns + 1),
+                                   np.abs(bucket_y), np.abs(bucket_y - bucket_rows + 1)])
+        reach = FOOD_BUCKET_CELLS * min(cell_width, cell_height)  # Narrowest side of a bucket in pixels
+        best = np.full(len(x), np.inf)
+        best_cell = np.full(len(x), -1, dtype=np.int64)
+        searching = np.arange(len(x))
+        ring = 0
+        while len(searching):
+            dx, dy = ring_offsets(ring)
+            query = np.repeat(searching, len(dx))
+            near_x = bucket_x[query] + np.tile(dx, len(searching))
+            near_y = bucket_y[query] + np.tile(dy, len(searching))
+            inside = np.flatnonzero((near_x >= 0) & (near_x < bucket_columns) & (near_y >= 0) & (near_y < bucket_rows))
+            query, near_x, near_y = query[inside], near_x[inside], near_y[inside]
+            occupied = np.flatnonzero(buckets[near_y, near_x])
+            if len(occupied):
+                # Every green cell in those buckets, paired with the position it is a candidate
+                # for; the pairs come grouped by position
+                query = np.repeat(query[occupied], FOOD_BUCKET_CELLS * FOOD_BUCKET_CELLS)
+                cell_x = (near_x[occupied, None] * FOOD_BUCKET_CELLS + self.offset_x).ravel()
+                cell_y = (near_y[occupied, None] * FOOD_BUCKET_CELLS + self.offset_y).ravel()
+                inside = np.flatnonzero((cell_x < columns) & (cell_y < rows))
+                query, cell_x, cell_y = query[inside], cell_x[inside], cell_y[inside]
+                green = np.flatnonzero(owner[cell_y, cell_x])
+                query, cell_x, cell_y = query[green], cell_x[green], cell_y[green]
+                candidate = cell_y * columns + cell_x
+                distance = np.hypot((cell_x + left + 0.5) * cell_width - x[query],
+                                    (cell_y + top + 0.5) * cell_height - y[query])
+                new_query = np.r_[True, query[1:] != query[:-1]]
+                closest = np.minimum.reduceat(distance, np.flatnonzero(new_query))
+                tied = np.flatnonzero(distance == closest[np.cumsum(new_query) - 1])
+                query, candidate, distance = query[tied], candidate[tied], distance[tied]
+                order = np.lexsort((candidate, query))
+                query, candidate, distance = query[order], candidate[order], distance[order]
+                first = np.flatnonzero(np.r_[True, query[1:] != query[:-1]])
+                query, candidate, distance = query[first], candidate[first], distance[first]
+                better = (distance < best[query]) | ((distance == best[query])
+                                                     & (candidate < best_cell[query]))
+                best[query[better]] = distance[better]
+                best_cell[query[better]] = candidate[better]
+            # Nothing beyond the next ring can be closer than ring * reach
+            searching = searching[(best[searching] > ring * reach) & (rings[searching] > ring)]
+            ring += 1
+        get = self.registry.get
+        owners = owner.ravel()[best_cell].tolist()
+        centre_x = ((best_cell % columns + left + 0.5) * cell_width).tolist()
+        centre_y = ((best_cell // columns + top + 0.5) * cell_height).tolist()
+        return [(get(plant_id), cell_x, cell_y) if cell >= 0 else None
+                for cell, plant_id, cell_x, cell_y in zip(best_cell.tolist(), owners, centre_x, centre_y)]
+
+def threat_field(left, top, columns, rows, cell_width, cell_height, threat_x, threat_y, reach):
+    # Nearest threat (an index into threat_x/threat_y, -1 for none) to the centre of every cell
+    # of one tile, among threats closer than reach
+    centre_x = left + (np.arange(columns) + 0.5) * cell_width
+    centre_y = top + (np.arange(rows) + 0.5) * cell_height
+    distance = np.hypot(centre_x[None, :, None] - threat_x, centre_y[:, None, None] - threat_y)
+    nearest = distance.argmin(axis=2)
+    found = np.take_along_axis(distance, nearest[..., None], axis=2)[..., 0] < reach
+    return np.where(found, nearest, -1)
+
+class InfluenceMap:
+    # Fields over the map cells that the herbivores and birds steer by, so none of them scans
+    # the threats itself. Every tick, each threat group gets a field holding every cell's
+    # nearest threat within THREAT_RANGE, built in tiles of TILE_CELLS so the distance table
+    # only spans the threats near one tile at a time. Reading one is a lookup per animal.
+    def __init__(self, game_map):
+        self.cell_width = game_map.cell_width
+        self.cell_height = game_map.cell_height
+        self.area = None  # (left, top, columns, rows) in cells
+        self.threats = []  # (x, y, field) per threat group, positions as of the build
+
+    def cover(self, area):
+        # The cells the fields span; positions outside read the nearest edge cell
+        self.area = area
+
+    def cells(self, x, y):
+        left, top, columns, rows = self.area
+        column = np.clip(np.floor(x / self.cell_width).astype(np.int64) - left, 0, columns - 1)
+        row = np.clip(np.floor(y / self.cell_height).astype(np.int64) - top, 0, rows - 1)
+        return row * columns + column
+
+    def rebuild_threats(self, threat_groups, radius=THREAT_RANGE):
+        left, top, columns, rows = self.area
+        cell_width, cell_height = self.cell_width, self.cell_height
+        reach = radius + math.hypot(cell_width, cell_height) / 2  # Anywhere in the cell within radius
+        self.threats = []
+        for group in threat_groups:
+            x, y = group.column("x").copy(), group.column("y").copy()
+            field = np.full((rows, columns), -1, dtype=np.int64)
+            for tile_top in range(0, rows if len(x) else 0, TILE_CELLS):
+                for tile_left in range(0, columns, TILE_CELLS):
+                    tile_columns, tile_rows = min(TILE_CELLS, columns - tile_left), min(TILE_CELLS, rows - tile_top)
+                    tile_x, tile_y = (left + tile_left) * cell_width, (top + tile_top) * cell_height
+                    near = np.flatnonzero((x >= tile_x - reach) & (x <= tile_x + tile_columns * cell_width + reach)
+                                          & (y >= tile_y - reach) & (y <= tile_y + tile_rows * cell_height + reach))
+                    if not len(near):
+                        continue
+                    result = threat_field(tile_x, tile_y, tile_columns, tile_rows, cell_width, cell_height,
+                                          x[near], y[near], reach)
+                    found = result >= 0
+                    field[tile_top:tile_top + tile_rows, tile_left:tile_left + tile_columns][found] = near[result[found]]
+            self.threats.append((x, y, field.ravel()))
+
+    def flee(self, group, radius, count=None):
+        # Turn the first count rows of group straight away from the nearest threat closer than
+        # radius, with later threat groups overriding earlier ones
+        count = len(group) if count is None else count
+        if count == 0 or not self.threats:
+            return
+        x, y = group.column("x")[:count], group.column("y")[:count]
+        direction = group.column("direction")[:count]
+        cells = self.cells(x, y)
+        for threat_x, threat_y, field in self.threats:
+            threat = field[cells]
+            rows = np.flatnonzero(threat >= 0)
+            dx = x[rows] - threat_x[threat[rows]]
+            dy = y[rows] - threat_y[threat[rows]]
+            fleeing = np.hypot(dx, dy) < radius
+            direction[rows[fleeing]] = np.arctan2(dy[fleeing], dx[fleeing])
+
+class LodScheduler:
+    # Level of detail for the per-entity updates. Rows that matter this tick (hungry, hunting,
+    # near a threat) get their full update every tick. Idle rows on screen keep moving every
+    # tick but run their per-entity logic only every idle_period ticks. Idle rows off screen do
+    # neither, doubling the period for each screen of distance up to max_period, and catch up
+    # on the movement they missed when they next run.
+    def __init__(self, idle_period=LOD_IDLE_PERIOD, max_period=LOD_MAX_PERIOD, margin=LOD_MARGIN):
+        self.idle_period = idle_period
+        self.max_period = max_period
+        self.margin = margin
+
+    def near(self, group, grid, kinds, radius):
+        # Rows within radius (plus the margin) of an entity of the given exact types, to the
+        # accuracy of the grid cells
+        n = len(group)
+        cell_x, cell_y = grid.occupied(kinds)
+        if not len(cell_x) or not n:
+            return np.zeros(n, dtype=bool)
+        reach = int(math.ceil((radius + self.margin) / grid.cell_size))
+        offsets = np.arange(-reach, reach + 1)
+        near_x, near_y = np.broadcast_arrays(cell_x[:, None, None] + offsets[None, :, None],
+                                             cell_y[:, None, None] + offsets[None, None, :])
+        near_keys = np.unique(grid.key(near_x, near_y))
+        row_x = np.floor_divide(group.column("x"), grid.cell_size).astype(np.int64)
+        row_y = np.floor_divide(group.column("y"), grid.cell_size).astype(np.int64)
+        return np.isin(grid.key(row_x, row_y), near_keys)
+
+    def plan(self, group, relevant, tick, view):
+        # (full, moving, steps): rows to update in full, rows to move and how many ticks each
+        # row's move covers. Periods are staggered by row so the skipped work spreads evenly.
+        n = len(group)
+        x, y = group.column("x"), group.column("y")
+        left, top, width, height = view
+        away = np.maximum(np.maximum(left - self.margin - x, x - (left + width + self.margin)) / width,
+                          np.maximum(top - self.margin - y, y - (top + height + self.margin)) / height)
+        on_screen = away <= 0
+        period = np.minimum(self.idle_period * 2 ** np.ceil(np.maximum(away, 0)), self.max_period).astype(np.int64)
+        period[relevant] = 1
+        full = relevant | ((tick + np.arange(n)) % period == 0)
+        moving = full | on_screen
+
+        lag = group.lag[:n]
+        steps = lag + 1
+        lag += 1
+        lag[moving] = 0
+        return full, moving, steps
 
-    raindrops = [Raindrop() for _ in range(RAINDROP_COUNT)]
+def draw_map(game_map):
+    # One rectangle per horizontal run of same-zone cells, since smoothed zones come in large
+    # patches and a big map has millions of cells
+    cell_width = game_map.cell_width
+    cell_height = game_map.cell_height
+
+    for zone_id, zone in enumerate(game_map.zones):
+        ys, xs = np.nonzero(game_map.zone_ids == zone_id)
+        color = zone.get_color()
+        for x, y, length in cell_runs(xs, ys):
+            rl.draw_rectangle(x * cell_width, y * cell_height, length * cell_width, cell_height, color)
+
+def cell_runs(xs, ys):
+    # Horizontal runs of adjacent map cells, given in any order, as (first x, y, length)
+    xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+    if not len(xs):
+        return []
+    order = np.lexsort((xs, ys))
+    xs, ys = xs[order], ys[order]
+    starts = np.flatnonzero(np.r_[True, (ys[1:] != ys[:-1]) | (xs[1:] != xs[:-1] + 1)])
+    lengths = np.diff(np.r_[starts, len(xs)])
+    return zip(xs[starts].tolist(), ys[starts].tolist(), lengths.tolist())
+
+class RenderBatch:
+    # Collects one frame's vegetation and animal markers grouped by colour,
+    # then submits each group back to back so raylib never has to switch state mid-batch
+    def __init__(self):
+        self.rects = {}  # color -> [(left, top, width, height)]
+        self.circles = {}  # (radius, color) -> ([xs], [ys])
+
+    def add_cells(self, xs, ys, cell_width, cell_height, color=PLANT_COLOR):
+        # Map cells, merged into one rectangle per horizontal run
+        self.add_runs(cell_runs(xs, ys), cell_width, cell_height, color)
+
+    def add_runs(self, runs, cell_width, cell_height, color=PLANT_COLOR):
+        rects = self.rects.setdefault(color, [])
+        for x, y, length in runs:
+            rects.append((x * cell_width, y * cell_height, length * cell_width, cell_height))
+
+    def add_circles(self, xs, ys, radius, color):
+        batch = self.circles.setdefault((radius, color), ([], []))
+        batch[0].extend(xs)
+        batch[1].extend(ys)
+
+    def flush(self):
+        for color, rects in self.rects.items():
+            for left, top, width, height in rects:
+                rl.draw_rectangle(left, top, width, height, color)
+        for (radius, color), (xs, ys) in self.circles.items():
+            for x, y in zip(xs, ys):
+                rl.draw_circle(x, y, radius, color)
+        self.rects.clear()
+        self.circles.clear()
+
+class Frame:
+    # One tick as the render loop sees it, sent over from the simulation process: HUD values, the
+    # precipitation kind of each zone, the green vegetation runs as (x, y, length) rows and the
+    # markers in view as {(radius, colour): (ids, xs, ys)}. Nothing in it refers to the live world.
+    __slots__ = ("tick", "view", "sunlight", "humidity", "zone_weather", "runs", "markers", "profile", "graph")
+
+    def __init__(self, tick, view, sunlight, humidity, zone_weather, runs, markers, profile=None, graph=None):
+        self.tick = tick
+        self.view = view
+        self.sunlight = sunlight
+        self.humidity = humidity
+        self.zone_weather = zone_weather
+        self.runs = runs
+        self.markers = markers
+        self.profile = profile  # Profiler overlay lines while the profiler is on
+        self.graph = graph  # PopulationStats.graph() while the graph is shown
+
+def interpolate_markers(previous, current, alpha):
+    # Marker positions alpha of the way from the previous frame to the current one, matched by
+    # entity id. Markers that are new, or changed colour, are drawn where the current frame has them.
+    positions = {}
+    for key, (ids, xs, ys) in current.markers.items():
+        before = previous.markers.get(key) if previous is not None and alpha < 1 else None
+        if before is not None:
+            _, rows, before_rows = np.intersect1d(ids, before[0], assume_unique=True, return_indices=True)
+            xs, ys = xs.copy(), ys.copy()
+            xs[rows] = before[1][before_rows] + (xs[rows] - before[1][before_rows]) * alpha
+            ys[rows] = before[2][before_rows] + (ys[rows] - before[2][before_rows]) * alpha
+        positions[key] = (xs, ys)
+    return positions
+
+def draw_graph(graph, x, y, width, height, ticks=STATS_GRAPH_TICKS):
+    # PopulationStats.graph() as one line per species, newest tick at the right edge and every
+    # line scaled to the largest population, with a legend of the latest counts
+    rl.draw_rectangle(x, y, width, height, (0, 0, 0, 160))
+    peak = max((values.max() for _, values in graph.values() if len(values)), default=0)
+    step = max(ticks // 150, 1)  # At most 150 segments a line
+    legend_y = y + 4
+    for name, (color, values) in graph.items():
+        count = len(values)
+        if count > 1 and peak:
+            index = np.arange(count - 1, -1, -step)[::-1]
+            xs = (x + width - (count - 1 - index) * width / ticks).astype(int).tolist()
+            ys = (y + height - values[index] * (height - 4) / peak).astype(int).tolist()
+            for i in range(len(xs) - 1):
+                rl.draw_line(xs[i], ys[i], xs[i + 1], ys[i + 1], color)
+        rl.draw_text(f"{name}: {values[-1] if count else 0}", x + 4, legend_y, 14, color)
+        legend_y += 14
+
+def pannable(game_map):
+    # Whether the view can be dragged: an unbounded world, or a map larger than the screen
+    return (isinstance(game_map, ChunkedMap) or game_map.pixel_width > SCREEN_WIDTH
+            or game_map.pixel_height > SCREEN_HEIGHT)
+
+class MapLayer:
+    # The zone background rendered once into a texture and blitted with a single draw call.
+    # It is only re-rendered when the map's version changes.
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.target = None
+        self.version = None
+
+    def render(self):
+        if self.target is None:
+            self.target = rl.load_render_texture(self.game_map.pixel_width, self.game_map.pixel_height)
+        rl.begin_texture_mode(self.target)
+        draw_map(self.game_map)
+        rl.end_texture_mode()
+        self.version = self.game_map.version
+
+    def draw(self, view=None):
+        if self.target is None or self.version != self.game_map.version:
+            self.render()
+        texture = self.target.texture
+        # Render textures are stored upside down, so flip the source rectangle
+        source = rl.Rectangle(0, 0, texture.width, -texture.height)
+        rl.draw_texture_rec(texture, source, rl.Vector2(0, 0), rl.WHITE)
+
+    def unload(self):
+        if self.target is not None:
+            rl.unload_render_texture(self.target)
+            self.target = None
+
+def draw_chunk(game_map, key):
+    # Zone cells of one chunk, drawn relative to the chunk's top-left corner
+    zone_ids = game_map.chunk(*key)
+    cell_width, cell_height = game_map.cell_width, game_map.cell_height
+    for y, row in enumerate(zone_ids.tolist()):
+        for x, zone_id in enumerate(row):
+            rl.draw_rectangle(x * cell_width, y * cell_height, cell_width, cell_height, game_map.zones[zone_id].get_color())
+
+class ChunkLayer:
+    # Chunked counterpart of MapLayer: one cached texture per visible chunk, least recently
+    # used textures are unloaded once more than max_textures are alive
+    def __init__(self, game_map, max_textures=24):
+        self.game_map = game_map
+        self.max_textures = max_textures
+        self.targets = OrderedDict()  # chunk key -> (render texture, map version)
+
+    def texture_for(self, key):
+        entry = self.targets.get(key)
+        if entry is not None and entry[1] == self.game_map.version:
+            self.targets.move_to_end(key)
+            return entry[0]
+        if entry is None:
+            size = self.game_map.chunk_size
+            target = rl.load_render_texture(size * self.game_map.cell_width, size * self.game_map.cell_height)
+        else:
+            target = entry[0]
+        rl.begin_texture_mode(target)
+        draw_chunk(self.game_map, key)
+        rl.end_texture_mode()
+        self.targets[key] = (target, self.game_map.version)
+        self.targets.move_to_end(key)
+        while len(self.targets) > self.max_textures:
+            _, (evicted, _) = self.targets.popitem(last=False)
+            rl.unload_render_texture(evicted)
+        return target
+
+    def draw(self, view=(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)):
+        game_map = self.game_map
+        chunk_width = game_map.chunk_size * game_map.cell_width
+        chunk_height = game_map.chunk_size * game_map.cell_height
+        left, top, width, height = view
+        for chunk_y in range(int(top // chunk_height), int((top + height) // chunk_height) + 1):
+            for chunk_x in range(int(left // chunk_width), int((left + width) // chunk_width) + 1):
+                texture = self.texture_for((chunk_x, chunk_y)).texture
+                source = rl.Rectangle(0, 0, texture.width, -texture.height)
+                rl.draw_texture_rec(texture, source, rl.Vector2(chunk_x * chunk_width, chunk_y * chunk_height), rl.WHITE)
+
+    def unload(self):
+        for target, _ in self.targets.values():
+            rl.unload_render_texture(target)
+        self.targets.clear()
+
+class TickProfiler:
+    # Times every update phase (and the draw phase, when the front end reports it) per tick and
+    # keeps the last PROFILE_WINDOW ticks for rolling percentiles. While disabled the
+    # simulation never calls into it, so switching it off costs nothing.
+    def __init__(self, window=PROFILE_WINDOW, enabled=False):
+        self.enabled = enabled
+        self.rows = deque(maxlen=window)  # One dict per tick: tick, phase ms and species counts
+        self.current = {}
+        self.phase_names = []
+        self.species_names = []
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.current = {}
+
+    def record(self, phase, seconds):
+        if phase not in self.phase_names:
+            self.phase_names.append(phase)
+        self.current[phase] = self.current.get(phase, 0.0) + seconds * 1000
+
+    def end_tick(self, tick, counts):
+        if not self.species_names:
+            self.species_names = list(counts)
+        row = {"tick": tick}
+        row.update(self.current)
+        row.update(counts)
+        self.rows.append(row)
+        self.current = {}
+
+    def percentile(self, phase, fraction):
+        values = sorted(row[phase] for row in self.rows if phase in row)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    def summary(self):
+        return {
+            "ticks": len(self.rows),
+            "phases": {phase: {"p50_ms": self.percentile(phase, 0.5), "p99_ms": self.percentile(phase, 0.99)}
+                       for phase in self.phase_names},
+            "counts": {name: self.rows[-1].get(name, 0) for name in self.species_names} if self.rows else {},
+        }
+
+    def export_json(self, path):
+        with open(path, "w") as out:
+            json.dump({"summary": self.summary(), "ticks": list(self.rows)}, out, indent=2)
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as out:
+            writer = csv.DictWriter(out, fieldnames=["tick"] + self.phase_names + self.species_names)
+            writer.writeheader()
+            writer.writerows(self.rows)
+
+    def export(self, path):
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
+
+    def lines(self):
+        # Overlay text: rolling p50/p99 per phase, a gap, then the latest population counts
+        lines = ["phase          p50 ms   p99 ms"]
+        for phase in self.phase_names:
+            lines.append(f"{phase:<12}{self.percentile(phase, 0.5):>9.2f}{self.percentile(phase, 0.99):>9.2f}")
+        if self.rows:
+            lines.append("")
+            lines.append("  ".join(f"{name}: {self.rows[-1].get(name, 0)}" for name in self.species_names))
+        return lines
+
+class PopulationStats:
+    # Per-tick aggregates of every species (count, births from reproduce, deaths by cause, mean
+    # hunger and health) and of the plants per zone (plants rooted there, green cells, biomass).
+    # Births and deaths are tallied by the entity lists as they happen; end_tick reads and resets
+    # the tallies once a tick and adds a row. Each field has its own ring buffer of history ticks,
+    # so memory stays flat however long the run, and stream() appends every STATS_BLOCK rows to a
+    # columnar file as they fill.
+    def __init__(self, populations, zones, history=STATS_HISTORY):
+        self.populations = populations
+        self.zones = zones
+        self.fields = {"tick": np.int64}
+        for kind in populations:
+            name = kind.__name__
+            self.fields[f"{name}.count"] = np.int32
+            if kind is not Plant:
+                self.fields[f"{name}.births"] = np.int32
+            for cause in kind.DEATH_CAUSES:
+                self.fields[f"{name}.{cause}"] = np.int32
+            if kind is not Plant:
+                self.fields[f"{name}.hunger"] = np.float32
+            self.fields[f"{name}.health"] = np.float32
+        for zone in zones:
+            self.fields[f"{zone.name}.plants"] = np.int32
+            self.fields[f"{zone.name}.cells"] = np.int32
+            self.fields[f"{zone.name}.biomass"] = np.int64
+        self.history = history
+        self.columns = {field: np.zeros(history, dtype=dtype) for field, dtype in self.fields.items()}
+        self.head = 0  # Ring position the next row goes to
+        self.size = 0  # Rows held, at most history
+        self.visible = False  # Whether the front end shows the population graph
+        self.file = None  # Columnar file the rows stream to, if any
+        self.unwritten = 0  # Rows not yet streamed to the file
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def end_tick(self, sim):
+        row = {"tick": sim.tick}
+        for kind, group in self.populations.items():
+            name = kind.__name__
+            row[f"{name}.count"] = len(group)
+            if kind is Plant:
+                row[f"{name}.health"] = group.health_total / len(group) if len(group) else 0.0
+            else:
+                row[f"{name}.births"] = group.births
+                row[f"{name}.hunger"] = group.column("hunger").mean() if len(group) else 0.0
+                row[f"{name}.health"] = group.column("health").mean() if len(group) else 0.0
+            for cause, deaths in zip(kind.DEATH_CAUSES, group.deaths):
+                row[f"{name}.{cause}"] = deaths
+            group.births, group.deaths = 0, [0, 0]
+
+        vegetation = sim.vegetation
+        zone_ids = sim.game_map.zone_window(*vegetation.area)
+        green = vegetation.owner > 0
+        cells = np.bincount(zone_ids[green], minlength=len(self.zones))
+        biomass = np.bincount(zone_ids[green], weights=vegetation.biomass[green], minlength=len(self.zones))
+        plants = sim.plants.zone_counts
+        for zone_id, zone in enumerate(self.zones):
+            row[f"{zone.name}.plants"] = plants[zone_id]
+            row[f"{zone.name}.cells"] = cells[zone_id]
+            row[f"{zone.name}.biomass"] = biomass[zone_id]
+
+        for field, value in row.items():
+            self.columns[field][self.head] = value
+        self.head = (self.head + 1) % self.history
+        self.size = min(self.size + 1, self.history)
+        if self.file is not None:
+            self.unwritten += 1
+            if self.unwritten >= min(STATS_BLOCK, self.history):
+                self.write_block()
+
+    def series(self, field, ticks=None):
+        # The field's last ticks values (all it holds by default), oldest first
+        count = self.size if ticks is None else min(ticks, self.size)
+        return self.columns[field][np.arange(self.head - count, self.head) % self.history]
+
+    def graph(self, ticks=STATS_GRAPH_TICKS):
+        # {species: (colour, counts over the last ticks)} for the population graph
+        lines = {}
+        for kind in self.populations:
+            color = PLANT_COLOR if kind is Plant else kind.MARKER_COLOR or Human.EMOTION_COLORS[SAD]
+            lines[kind.__name__] = (color, self.series(f"{kind.__name__}.count", ticks))
+        return lines
+
+    def stream(self, path):
+        self.file = open(path, "wb")
+        self.file.write(STATS_MAGIC + struct.pack("<I", STATS_VERSION))
+        self.unwritten = 0
+
+    def write_block(self):
+        block = encode_arrays({field: self.series(field, self.unwritten) for field in self.fields})
+        self.file.write(struct.pack("<I", len(block)) + block)
+        self.unwritten = 0
+
+    def close(self):
+        if self.file is not None:
+            if self.unwritten:
+                self.write_block()
+            self.file.close()
+            self.file = None
+
+def read_stats(path):
+    # {field: values over every tick} from a file PopulationStats.stream wrote
+    with open(path, "rb") as stats:
+        prefix = stats.read(len(STATS_MAGIC) + 4)
+        if prefix[:len(STATS_MAGIC)] != STATS_MAGIC:
+            raise ValueError(f"{path} is not a statistics file")
+        version, = struct.unpack("<I", prefix[len(STATS_MAGIC):])
+        if version != STATS_VERSION:
+            raise ValueError(f"{path} is statistics version {version}, expected {STATS_VERSION}")
+        blocks = []
+        while True:
+            length = stats.read(4)
+            if len(length) < 4:
+                break
+            blocks.append(decode_arrays(stats.read(struct.unpack("<I", length)[0])))
+    if not blocks:
+        return {}
+    return {field: np.concatenate([block[field] for block in blocks]) for field in blocks[0]}
+
+class Simulation:
+    # Owns the whole world state and advances it one tick at a time, with no rendering
+    # With chunked=True the world has no edges: zones come from a ChunkedMap and everything
+    # outside the chunks around the view is parked in a ChunkArchive until the view returns
+    def __init__(self, map_width=100, map_height=100, seed=None, map_time_budget=None,
+                 chunked=False, chunk_memory_cap=CHUNK_MEMORY_CAP, archive_dir=None, game_map=None, lod=False,
+                 tunables=None):
+        if game_map is not None:
+            chunked = isinstance(game_map, ChunkedMap)  # An existing map, e.g. from a snapshot
+        self.rngs = RngService(seed)
+        self.registry = EntityRegistry()
+        if game_map is not None:
+            self.game_map = game_map
+        elif chunked:
+            self.game_map = ChunkedMap(seed or 0, memory_cap=chunk_memory_cap)
+        else:
+            self.game_map = Map(map_width, map_height, 1, seed=seed, time_budget=map_time_budget)
+        bounds = None if chunked else (self.game_map.pixel_width, self.game_map.pixel_height)
+
+        def store(kind):
+            rng = self.rngs.stream(kind.__name__)  # One stream per species
+            return EntityStore(kind, rng=rng, bounds=bounds, registry=self.registry)
+        self.vegetation = Vegetation(self.game_map, self.rngs.stream("vegetation"))  # Grass cells of the plants
+        self.plants = PlantList(self.vegetation, registry=self.registry, rng=self.rngs.stream("Plant"))
+        self.animals = store(Animal)
+        self.predators = store(Predator)
+        self.tigers = store(Tiger)
+        self.lions = store(Lion)
+        self.humans = store(Human)
+        self.rabbits = store(Rabbit)
+        self.birds = store(Bird)
+        self.populations = {
+            Plant: self.plants,
+            Animal: self.animals,
+            Predator: self.predators,
+            Tiger: self.tigers,
+            Lion: self.lions,
+            Human: self.humans,
+            Rabbit: self.rabbits,
+            Bird: self.birds,
+        }
+        for name, value in (tunables or {}).items():
+            self.tune(name, value)
+
+        self.sunlight = 50
+        self.humidity = 50
+        self.weather = SUNNY
+        self.tick = 0
+
+        weather_rng = self.rngs.stream("weather")
+        self.zone_weather = np.zeros(len(self.game_map.zones), dtype=np.uint8)  # Precipitation kind by zone id
+        self.view = (0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)  # World rectangle the camera shows
+        for zone in self.game_map.zones:
+            zone.rng = weather_rng
+        if chunked:
+            self.archive = ChunkArchive(archive_dir)
+            self.active_radius = ACTIVE_CHUNK_RADIUS
+            self.active_chunks = self.game_map.chunks_around(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, self.active_radius)
+        else:
+            self.archive = None
+        self.vegetation.cover(self.field_area())
+        self.grid = SpatialGrid()
+        self.influence = InfluenceMap(self.game_map)  # Threat fields
+        self.lod = LodScheduler() if lod else None  # Reduced update rates for idle entities
+        self.profiler = TickProfiler()
+        self.stats = PopulationStats(self.populations, self.game_map.zones)
+        self.checkpointer = None  # Checkpointer writing periodic snapshots, if any
+        self.events = None  # EventLog recording the run, if any
+
+        # Update phases in tick order; benchmarks and the profiler time them one by one
+        self.phases = [
+            ("world", self.update_world),
+            ("plants", self.update_plants),
+            ("predators", self.update_all_predators),
+            ("humans", self.update_humans),
+            ("herbivores", self.update_all_herbivores),
+            ("birds", self.update_birds),
+            ("lifecycle", self.update_lifecycle),
+        ]
 
-    desert = Zone("Desert", (30, 50), (5, 15),DESERT_COLOR)
-    grassland = Zone("Grassland", (15, 30), (30, 60),GRASSLAND_COLOR)
-    forest = Zone("Forest", (5, 20), (60, 90),FOREST_COLOR)
-    tundra = Zone("Tundra", (-30, 5), (10, 30),TUNDRA_COLOR)
+    def tune(self, name, value):
+        # Set one of TUNABLES for this world only
+        if name not in TUNABLES:
+            raise ValueError(f"unknown tunable: {name}")
+        kind, attribute = TUNABLES[name]
+        setattr(self.vegetation if kind is Plant else self.populations[kind], attribute, value)
+
+    def spawn(self, kind, x, y):
+        if kind is Plant:
+            return self.plants.spawn(x, y, self.game_map)
+        return self.populations[kind].spawn(x, y)
+
+    def populate(self, counts):
+        # Scatter the requested number of each kind uniformly over the map (the screen for a
+        # chunked world)
+        rng = self.rngs.stream("spawn")
+        game_map = self.game_map
+        width, height = SCREEN_WIDTH, SCREEN_HEIGHT
+        if not isinstance(game_map, ChunkedMap):
+            width, height = game_map.pixel_width, game_map.pixel_height
+        for kind, count in counts.items():
+            for _ in range(count):
+                self.spawn(kind, rng.randint(0, width - 1), rng.randint(0, height - 1))
+
+    def refresh_chunks(self):
+        # Bring back chunks that came into range and park everything outside the active chunks
+        game_map = self.game_map
+        left, top, width, height = self.view
+        active = game_map.chunks_around(left + width / 2, top + height / 2, self.active_radius)
+        min_x, min_y = min(active)
+        max_x, max_y = max(active)
+        chunk_width = game_map.chunk_size * game_map.cell_width
+        chunk_height = game_map.chunk_size * game_map.cell_height
+        parked = {}
+        for kind, group in self.populations.items():
+            if kind is Plant:
+                leaving = [plant for plant in group if game_map.chunk_of_pixel(plant.x, plant.y) not in active]
+            else:
+                # Find the animals outside the active square straight from the position columns
+                chunk_x = np.floor(group.column("x") / chunk_width)
+                chunk_y = np.floor(group.column("y") / chunk_height)
+                outside = (chunk_x < min_x) | (chunk_x > max_x) | (chunk_y < min_y) | (chunk_y > max_y)
+                leaving = [group[row] for row in np.flatnonzero(outside).tolist()]
+            for entity in leaving:
+                group.remove(entity)
+                key = game_map.chunk_of_pixel(entity.x, entity.y)
+                parked.setdefault(key, {}).setdefault(kind, []).append(entity)
+        for key, populations in sorted(parked.items()):
+            self.archive.save(key, populations, game_map)
+
+        # Move the vegetation window before unparking, so returning plants find room for their cells
+        arriving = sorted(active - self.active_chunks)
+        self.active_chunks = active
+        self.vegetation.cover(self.field_area())
+        for key in arriving:
+            if key in self.archive:
+                for kind, entities in self.archive.load(key, game_map).items():
+                    for entity in entities:
+                        self.populations[kind].append(entity)
+
+    def record_events(self, path, keyframe_interval=EVENT_KEYFRAME_INTERVAL):
+        # Start an event log of everything from this tick on
+        self.events = EventLog(path, keyframe_interval)
+        for group in self.populations.values():
+            group.events = self.events
+        self.vegetation.events = self.events
+        self.events.start(self)
+
+    def log_input(self, label, x=0, y=0):
+        if self.events is not None:
+            self.events.input(label, x, y)
+
+    def cycle_weather(self):
+        self.weather = (self.weather % 3) + 1
+        self.refresh_climate()
+
+    def refresh_climate(self):
+        # New climate fields and zone precipitation for this climate tick and weather
+        self.game_map.refresh_climate(self.tick // CLIMATE_INTERVAL, self.weather)
+        self.zone_weather = zone_precipitation(self.game_map.zones, self.weather)
+        if self.events is not None:
+            self.events.weather(self)
+
+    def adjust_sunlight(self, delta):
+        self.sunlight = max(0, min(self.sunlight + delta, 100))
+        if self.events is not None:
+            self.events.weather(self)
+
+    def adjust_humidity(self, delta):
+        self.humidity = max(0, min(self.humidity + delta, 100))
+        if self.events is not None:
+            self.events.weather(self)
+
+    def snapshot(self):
+        # The whole world as (meta, columns) for write_snapshot; take it between ticks
+        game_map = self.game_map
+        meta = {
+            "tick": self.tick,
+            "sunlight": self.sunlight,
+            "humidity": self.humidity,
+            "weather": self.weather,
+            "view": list(self.view),
+            "seed": self.rngs.seed,
+            "streams": [],
+            "next_id": self.registry.next_id,
+            "climate": [game_map.epoch, game_map.weather],
+        }
+        columns = {}
+        for i, ((name, *keys), stream) in enumerate(self.rngs.streams.items()):
+            state, batch = stream.getstate()
+            meta["streams"].append([name, keys, state])
+            columns[f"streams.{i}"] = np.array(batch, dtype=np.float64)
+
+        if self.archive is None:
+            meta["map"] = {"kind": "Map", "width": game_map.width, "height": game_map.height,
+                           "zone_size": game_map.zone_size, "rng": game_map.rng.bit_generator.state,
+                           "climate_seed": game_map.climate_seed}
+            columns["map.zone_ids"] = game_map.zone_ids.copy()
+        else:
+            # Chunks regenerate from the seed, so only the edits and the parked entities are saved
+            meta["map"] = {"kind": "ChunkedMap", "seed": game_map.seed, "chunk_size": game_map.chunk_size,
+                           "cell_width": game_map.cell_width, "cell_height": game_map.cell_height,
+                           "memory_cap": game_map.memory_cap, "smoothing_passes": game_map.smoothing_passes}
+            meta["active_chunks"] = sorted(list(key) for key in self.active_chunks)
+            edits = [(chunk_x, chunk_y, local_x, local_y, zone_id)
+                     for (chunk_x, chunk_y), cells in game_map.edits.items()
+                     for (local_x, local_y), zone_id in cells.items()]
+            columns["map.edits"] = np.array(edits, dtype=np.int64).reshape(-1, 5)
+            for chunk_x, chunk_y in self.archive.keys():
+                for name, values in self.archive.read((chunk_x, chunk_y)).items():
+                    columns[f"parked.{chunk_x},{chunk_y}.{name}"] = values
+
+        for kind, group in self.populations.items():
+            packed = pack_plants(group, self.vegetation) if kind is Plant else group.pack()
+            for name, values in packed.items():
+                columns[f"{kind.__name__}.{name}"] = values
+        columns["world.zone_weather"] = self.zone_weather.copy()
+        return meta, columns
+
+    def save(self, path):
+        write_snapshot(path, *self.snapshot())
+
+    def counts(self):
+        return {kind.__name__: len(entities) for kind, entities in self.populations.items()}
+
+    def step(self, n=1):
+        for _ in range(n):
+            self.update()
+        return self
+
+    def update_predators(self, group):
+        animals, humans, rabbits, grid = self.animals, self.humans, self.rabbits, self.grid
+
+        # Sated predators only wander, so they all move in one vectorized pass
+        sated = group.column("hunger") >= 60
+        if self.lod is None:
+            full, moving, steps = itertools.repeat(True), sated, None
+        else:
+            # Hunting predators and those within reach of a human stay at full rate
+            relevant = ~sated | self.lod.near(group, grid, (Human,), 20)
+            full, moving, steps = self.lod.plan(group, relevant, self.tick, self.view)
+            full, moving = full.tolist(), sated & moving
+        if group.kind is Lion:
+            Lion.move_as_group(group, sated)
+        group.move(moving, bravery_scaled=False, hunger_decay=0.1, steps=steps)
+
+        for predator, wandered, updated in zip(group.entities, sated.tolist(), full):
+            if not predator.alive or not updated:
+                continue
+            if not wandered:
+                predator.stalk(animals, rabbits, grid)
+            predator.attack_humans(humans, grid)
+            grid.update(predator)
+            if predator.hunger <= 0:
+                group.kill(predator)
+                grid.remove(predator)
+
+    def update_herbivores(self, group):
+        count = len(group)
+        if self.lod is None:
+            group.move()
+            full = np.ones(count, dtype=bool)
+        else:
+            # Hungry animals and those near a threat stay at full rate
+            relevant = (group.column("hunger") < 30) | self.lod.near(group, self.grid, (Predator, Human), 30)
+            full, moving, steps = self.lod.plan(group, relevant, self.tick, self.view)
+            group.move(moving, steps=steps)
+        self.graze_and_breed(group, full)
+
+        # Flee from predators and humans; only turns the animals, so it runs after the rest
+        self.influence.flee(group, 30, count)
+
+    def graze_and_breed(self, group, full):
+        # Animal.eat_plants, Animal.reproduce and starving for the rows of group updated in full
+        # this tick (full has one entry per row), over whole columns. Rows killed earlier in the
+        # tick sit out, and newborns join in from the next tick.
+        self.grid.refile(group)
+        acting = full & group.living()
+        self.feed(group, np.flatnonzero(acting & (group.column("hunger") < 30)))
+        self.breed(group, acting)
+        entities = group.entities
+        for row in np.flatnonzero(acting & (group.column("hunger")[:len(acting)] <= 0)).tolist():
+            group.kill(entities[row])
+            self.grid.remove(entities[row])
+
+    def feed(self, group, hungry):
+        # The hungry rows find the nearest green cell in one batched query, then walk towards it
+        # or, once within reach, take a bite
+        if not len(hungry):
+            return
+        columns = group.columns
+        x, y = columns["x"][hungry], columns["y"][hungry]
+        food = self.plants.food.nearest(x, y)
+        found = [i for i, nearest in enumerate(food) if nearest is not None and nearest[0].alive]
+        if not found:
+            return
+        rows, x, y = hungry[found], x[found], y[found]
+        food = [food[i] for i in found]
+        food_x = np.array([nearest[1] for nearest in food])
+        food_y = np.array([nearest[2] for nearest in food])
+        distance = np.hypot(food_x - x, food_y - y)
+        far = np.flatnonzero(distance > 15)
+        columns["x"][rows[far]] += (food_x[far] - x[far]) / distance[far] * 2
+        columns["y"][rows[far]] += (food_y[far] - y[far]) / distance[far] * 2
+
+        # Bites in row order, as the first bites can leave a cell bare for the later ones
+        plants, entities = self.plants, group.entities
+        fed = [row for row, (plant, cell_x, cell_y), near in zip(rows.tolist(), food, (distance <= 15).tolist())
+               if near and plants.graze(plant, cell_x, cell_y, entities[row])]
+        columns["health"][fed] = np.minimum(columns["health"][fed] + 50, 100)
+        columns["hunger"][fed] = np.minimum(columns["hunger"][fed] + 70, 100)
+
+    def breed(self, group, acting):
+        # Every acting row that has not reproduced pairs with another row that has not either,
+        # within its reproduction_range, and the pair has one young near the first of them
+        columns, count = group.columns, len(acting)
+        partners = group.living()[:count] & (columns["has_reproduced"][:count] == 0)
+        seekers = partners & acting
+        if not seekers.any():
+            return
+        first, second = pair_up(columns["x"][:count], columns["y"][:count],
+                                columns["reproduction_range"][:count], seekers, partners)
+        if not len(first):
+            return
+        columns["has_reproduced"][first] = 1
+        columns["has_reproduced"][second] = 1
+        offset = group.rng.generator.uniform(-10, 10, (len(first), 2))
+        x, y = columns["x"][first] + offset[:, 0], columns["y"][first] + offset[:, 1]
+        for new_x, new_y in zip(x.tolist(), y.tolist()):
+            group.spawn(new_x, new_y)
+        group.births += len(first)
+        self.grid.refile(group)
+
+    def update_world(self):
+        if self.archive is not None and self.tick % CHUNK_REFRESH_INTERVAL == 0:
+            self.refresh_chunks()
+        if self.tick % CLIMATE_INTERVAL == 0:
+            self.refresh_climate()
+        self.grid.rebuild(self.animals, self.predators, self.tigers, self.lions, self.humans, self.rabbits, self.birds)
+
+        influence = self.influence
+        area = self.field_area()
+        self.vegetation.cover(area)
+        influence.cover(area)
+        influence.rebuild_threats((self.predators, self.humans))
+
+    def field_area(self):
+        # Cells the influence fields span: the whole map, or the active chunks of a chunked world
+        game_map = self.game_map
+        if self.archive is None:
+            return (0, 0, game_map.width, game_map.height)
+        min_x, min_y = min(self.active_chunks)
+        max_x, max_y = max(self.active_chunks)
+        size = game_map.chunk_size
+        return (min_x * size, min_y * size, (max_x - min_x + 1) * size, (max_y - min_y + 1) * size)
+
+    def update_plants(self):
+        for plant in self.plants:
+            plant.wither(self.sunlight, self.humidity, self.plants)
+        self.vegetation.grow(self.sunlight, self.humidity)
+
+    def update_all_predators(self):
+        self.update_predators(self.predators)
+        self.update_predators(self.tigers)
+        self.update_predators(self.lions)
+
+    def update_humans(self):
+        animals, predators, rabbits, grid = self.animals, self.predators, self.rabbits, self.grid
+        for human in self.humans:
+            if not human.alive:
+                continue
+            human.move()
+            grid.update(human)
+            human.hunt(animals, predators,rabbits, grid)
+            if human.hunger <= 0:
+                self.humans.kill(human)
+                grid.remove(human)
+
+    def update_all_herbivores(self):
+        self.update_herbivores(self.animals)
+        self.update_herbivores(self.rabbits)
+
+    def update_birds(self):
+        birds, grid = self.birds, self.grid
+
+        # Birds flock, dodge threats (which overrides flocking), then fly on in one vectorized pass
+        BIRD_FLOCK.steer(birds)
+        self.influence.flee(birds, 70)
+        if self.lod is None:
+            birds.move(bravery_scaled=False, turn_chance=0.6)
+            full = np.ones(len(birds), dtype=bool)
+        else:
+            relevant = (birds.column("hunger") < 30) | self.lod.near(birds, grid, (Predator, Human), 70)
+            full, moving, steps = self.lod.plan(birds, relevant, self.tick, self.view)
+            birds.move(moving, bravery_scaled=False, turn_chance=0.6, steps=steps)
+        self.graze_and_breed(birds, full)
+
+    def update_lifecycle(self):
+        # Compact away everything that died this tick
+        for group in self.populations.values():
+            group.flush()
+        self.stats.end_tick(self)
+        self.tick += 1
+        if self.checkpointer is not None:
+            self.checkpointer.after_tick(self)
+        if self.events is not None:
+            self.events.end_tick(self)
+
+    def update(self):
+        profiler = self.profiler
+        if not profiler.enabled:
+            for _, phase in self.phases:
+                phase()
+            return
 
-    game_map = Map(100, 100,1)  # Example map size 10x10
+        for name, phase in self.phases:
+            started = time.perf_counter()
+            phase()
+            profiler.record(name, time.perf_counter() - started)
+        profiler.end_tick(self.tick, self.counts())
+
+    def frame(self):
+        # What a render loop needs to draw this tick, culled to the view
+        left, top, width, height = self.view
+        markers = {}
+        for group in (self.animals, self.predators, self.humans, self.rabbits, self.birds, self.tigers, self.lions):
+            if not len(group):
+                continue
+            kind, entities = group.kind, group.entities
+            xs, ys = group.column("x"), group.column("y")
+            margin = kind.MARKER_RADIUS
+            rows = np.flatnonzero((xs >= left - margin) & (xs <= left + width + margin)
+                                  & (ys >= top - margin) & (ys <= top + height + margin)).tolist()
+            if kind.MARKER_COLOR is not None:
+                colors = {kind.MARKER_COLOR: rows}
+            else:
+                colors = {}
+                for row in rows:
+                    colors.setdefault(entities[row].marker_color(), []).append(row)
+            for color, picked in colors.items():
+                parts = markers.setdefault((kind.MARKER_RADIUS, color), ([], [], []))
+                parts[0].append(np.array([entities[row].id for row in picked], dtype=np.int64))
+                parts[1].append(xs[picked].astype(np.float32))
+                parts[2].append(ys[picked].astype(np.float32))
+        markers = {key: tuple(np.concatenate(part) for part in parts) for key, parts in markers.items()}
+        runs = np.array(list(cell_runs(*self.vegetation.green_cells(self.view))), dtype=np.int64).reshape(-1, 3)
+        zone_weather = self.zone_weather.copy()
+        profile = self.profiler.lines() if self.profiler.enabled else None
+        graph = self.stats.graph() if self.stats.visible else None
+        return Frame(self.tick, self.view, self.sunlight, self.humidity, zone_weather, runs, markers, profile, graph)
+
+    def set_view(self, view):
+        self.view = tuple(view)
+
+def load_snapshot(path, archive_dir=None):
+    # Rebuild a Simulation from a snapshot file written by Simulation.save or a Checkpointer
+    meta, columns = read_snapshot(path)
+    saved_map = meta["map"]
+    if saved_map["kind"] == "Map":
+        game_map = Map(saved_map["width"], saved_map["height"], saved_map["zone_size"],
+                       zone_ids=columns["map.zone_ids"])
+        game_map.rng.bit_generator.state = saved_map["rng"]
+        game_map.climate_seed = saved_map["climate_seed"]
+    else:
+        game_map = ChunkedMap(saved_map["seed"], saved_map["chunk_size"], saved_map["cell_width"],
+                              saved_map["cell_height"], saved_map["memory_cap"], saved_map["smoothing_passes"])
+        for chunk_x, chunk_y, local_x, local_y, zone_id in columns["map.edits"].tolist():
+            game_map.edits.setdefault((chunk_x, chunk_y), {})[(local_x, local_y)] = zone_id
+
+    sim = Simulation(seed=meta["seed"], game_map=game_map, archive_dir=archive_dir)
+    sim.tick, sim.weather = meta["tick"], meta["weather"]
+    game_map.refresh_climate(*meta["climate"])
+    sim.sunlight, sim.humidity = meta["sunlight"], meta["humidity"]
+    sim.view = tuple(meta["view"])
+
+    if sim.archive is not None:
+        sim.active_chunks = {tuple(key) for key in meta["active_chunks"]}
+        sim.vegetation.cover(sim.field_area())
+
+    grouped, parked = {}, {}
+    for name, values in columns.items():
+        if name.startswith("parked."):
+            _, key, field = name.split(".", 2)
+            parked.setdefault(tuple(int(part) for part in key.split(",")), {})[field] = values
+        else:
+            prefix, field = name.split(".", 1)
+            grouped.setdefault(prefix, {})[field] = values
+    for kind, group in sim.populations.items():
+        arrays = grouped[kind.__name__]
+        if kind is Plant:
+            for plant in unpack_plants(arrays, game_map):
+                group.append(plant)
+        else:
+            group.restore(arrays)
+    sim.registry.next_id = meta["next_id"]
+    if sim.archive is not None:
+        for key, arrays in parked.items():
+            sim.archive.write(key, arrays)
+
+    sim.zone_weather = grouped["world"]["zone_weather"].copy()
+
+    # Restore the streams last, building the Simulation above drew from them
+    for i, (name, keys, state) in enumerate(meta["streams"]):
+        sim.rngs.stream(name, *keys).setstate((state, grouped["streams"][str(i)].tolist()))
+    return sim
+
+def build_simulation(args):
+    # The world the command line asks for: resumed from a snapshot or freshly populated
+    if args.load:
+        sim = load_snapshot(args.load, archive_dir=args.archive_dir)
+        sim.lod = LodScheduler() if args.lod else None
+    else:
+        sim = Simulation(args.map_size[0], args.map_size[1], seed=args.seed, chunked=args.chunked,
+                         chunk_memory_cap=args.chunk_memory * 1024 * 1024, archive_dir=args.archive_dir,
+                         lod=args.lod)
+    sim.populate({kind: getattr(args, kind.__name__.lower())
+                  for kind in (Plant, Animal, Predator, Tiger, Lion, Human, Rabbit, Bird)})
+    if args.checkpoint:
+        sim.checkpointer = Checkpointer(args.checkpoint, args.checkpoint_every)
+    if args.record:
+        sim.record_events(args.record, args.record_keyframes)
+    if args.stats:
+        sim.stats.stream(args.stats)
+    return sim
+
+def close_simulation(sim):
+    sim.stats.close()
+    if sim.checkpointer is not None:
+        sim.checkpointer.close()
+    if sim.events is not None:
+        sim.events.close()
+    if sim.archive is not None:
+        sim.archive.close()
+
+def run_simulation_process(conn, args):
+    # Body of the simulation process behind the interactive front end. It sends the map and a
+    # first frame, then ticks args.sim_rate times a second (0 = as fast as it can). Messages run
+    # between ticks: ("frame", ()) asks for the frame of the next tick, ("close", ()) stops, and
+    # anything else names a method of the simulation, e.g. ("profiler.toggle", ()).
+    sim = build_simulation(args)
+    try:
+        conn.send(pack_map(sim.game_map))
+        conn.send(sim.frame())
+        interval = 1 / args.sim_rate if args.sim_rate > 0 else 0.0
+        next_tick = time.perf_counter()
+        wanted = False
+        while True:
+            while conn.poll(max(next_tick - time.perf_counter(), 0)):
+                command, command_args = conn.recv()
+                if command == "close":
+                    return
+                if command == "frame":
+                    wanted = True
+                    continue
+                target = sim
+                for name in command.split("."):
+                    target = getattr(target, name)
+                target(*command_args)
+            sim.update()
+            if wanted:
+                conn.send(sim.frame())
+                wanted = False
+            # A slow tick delays the next one instead of bunching ticks up to catch up
+            next_tick = max(next_tick + interval, time.perf_counter())
+    except (EOFError, BrokenPipeError):
+        pass  # The front end went away
+    finally:
+        close_simulation(sim)
+
+class SimulationProcess:
+    # The interactive front end's handle on a simulation running in a process of its own, so a
+    # slow tick never drops a frame and a slow frame never stalls a tick. A receiver thread keeps
+    # the two latest frames (swapped in under a lock) for the render loop to interpolate between;
+    # the render loop asks for the next frame once it has drawn and posts input as commands.
+    def __init__(self, args):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=run_simulation_process, args=(child, args), name="simulation")
+        self.process.start()
+        child.close()
+        try:
+            self.game_map = unpack_map(self.conn.recv())  # Our own copy to draw the zones from
+            self.latest = self.conn.recv()
+        except EOFError:
+            self.process.join()
+            raise RuntimeError(f"simulation process exited with code {self.process.exitcode}") from None
+        self.previous = None
+        self.latest_time = self.previous_time = time.perf_counter()
+        self.lock = threading.Lock()
+        self.waiting = False  # A frame has been asked for and not arrived yet
+        self.alive = True
+        self.receiver = threading.Thread(target=self.receive, daemon=True)
+        self.receiver.start()
+
+    def receive(self):
+        while True:
+            try:
+                frame = self.conn.recv()
+            except (EOFError, OSError):
+                self.alive = False
+                return
+            with self.lock:
+                self.previous, self.latest = self.latest, frame
+                self.previous_time, self.latest_time = self.latest_time, time.perf_counter()
+                self.waiting = False
+
+    def frames(self):
+        # The two latest frames and how far the render time has moved from the older to the newer
+        with self.lock:
+            previous, latest = self.previous, self.latest
+            interval = self.latest_time - self.previous_time
+            elapsed = time.perf_counter() - self.latest_time
+        if previous is None or interval <= 0:
+            return None, latest, 1.0
+        return previous, latest, min(elapsed / interval, 1.0)
+
+    def post(self, command, *args):
+        # Run a simulation method, named by its dotted path, before the next tick
+        try:
+            self.conn.send((command, args))
+        except OSError:
+            self.alive = False
+
+    def request_frame(self):
+        with self.lock:
+            if self.waiting:
+                return
+            self.waiting = True
+        self.post("frame")
+
+    def close(self):
+        self.post("close")
+        self.process.join()
+        self.conn.close()
+        if self.process.exitcode:
+            raise RuntimeError(f"simulation process exited with code {self.process.exitcode}")
 
+# Initialize the simulation
+def run_interactive(args):
+    # The window runs at 60 FPS on its own, drawing the simulation process's latest frames
+    client = SimulationProcess(args)
+    load_raylib()
+    rl.init_window(SCREEN_WIDTH, SCREEN_HEIGHT, b"Open World Simulation")
+    rl.set_target_fps(60)
+    game_map = client.game_map
+    map_layer = ChunkLayer(game_map) if isinstance(game_map, ChunkedMap) else MapLayer(game_map)
+    precipitation = Precipitation(args.particles)  # Particles are only for show, so the window keeps its own
+    batch = RenderBatch()
+    view = client.latest.view
+
+    spawn_keys = [
+        (rl.KEY_A, Animal),
+        (rl.KEY_P, Predator),
+        (rl.KEY_H, Human),
+        (rl.KEY_R, Rabbit),
+        (rl.KEY_B, Bird),
+        (rl.KEY_L, Lion),
+        (rl.KEY_T, Tiger),
+    ]
+
+    last_mouse = (rl.get_mouse_x(), rl.get_mouse_y())
+    try:
+        while client.alive and not rl.window_should_close():
+            previous, frame, alpha = client.frames()
+
+            # Drag with the right mouse button to pan around a world larger than the screen
+            mouse = (rl.get_mouse_x(), rl.get_mouse_y())
+            left, top, width, height = view
+            if pannable(game_map) and rl.is_mouse_button_down(rl.MOUSE_BUTTON_RIGHT):
+                left, top = left - (mouse[0] - last_mouse[0]), top - (mouse[1] - last_mouse[1])
+                view = (left, top, width, height)
+                client.post("set_view", view)
+            last_mouse = mouse
+            world_x, world_y = int(mouse[0] + left), int(mouse[1] + top)
+
+            # Input handling to place entities
+            if rl.is_mouse_button_pressed(rl.MOUSE_BUTTON_LEFT):
+                client.post("log_input", "click: plant", world_x, world_y)
+                client.post("spawn", Plant, world_x, world_y)
+
+            # Check for key presses to spawn specific animal types
+            for key, kind in spawn_keys:
+                if rl.is_key_pressed(key):
+                    client.post("log_input", f"key: {kind.__name__.lower()}", world_x, world_y)
+                    client.post("spawn", kind, world_x, world_y)
+                    break  # Only one spawn per frame
+
+            if rl.is_key_pressed(rl.KEY_W):  # 'W' key changes weather
+                client.post("log_input", "key: weather")
+                client.post("cycle_weather")
+
+            # Edit parameters with keyboard input
+            if rl.is_key_pressed(rl.KEY_UP):
+                client.post("log_input", "key: sunlight +5")
+                client.post("adjust_sunlight", 5)
+            elif rl.is_key_pressed(rl.KEY_DOWN):
+                client.post("log_input", "key: sunlight -5")
+                client.post("adjust_sunlight", -5)
+            elif rl.is_key_pressed(rl.KEY_LEFT):
+                client.post("log_input", "key: humidity -5")
+                client.post("adjust_humidity", -5)
+            elif rl.is_key_pressed(rl.KEY_RIGHT):
+                client.post("log_input", "key: humidity +5")
+                client.post("adjust_humidity", 5)
+
+            if rl.is_key_pressed(rl.KEY_F3):  # F3 toggles the profiler overlay
+                client.post("profiler.toggle")
+            if rl.is_key_pressed(rl.KEY_F4) and frame.profile:  # F4 exports the profile
+                client.post("profiler.export_json", f"profile_{frame.tick}.json")
+                client.post("profiler.export_csv", f"profile_{frame.tick}.csv")
+            if rl.is_key_pressed(rl.KEY_F5):  # F5 saves a snapshot of the world
+                client.post("save", f"world_{frame.tick}.snap")
+            if rl.is_key_pressed(rl.KEY_F6):  # F6 toggles the population graph
+                client.post("stats.toggle")
+
+            # Draw the latest frame, with the markers moved part of the way from the one before
+            draw_started = time.perf_counter()
+            rl.begin_drawing()
+            camera = rl.Camera2D(rl.Vector2(0, 0), rl.Vector2(view[0], view[1]), 0.0, 1.0)
+            rl.begin_mode2d(camera)
+            map_layer.draw(view)
+            precipitation.zone_weather[:len(frame.zone_weather)] = frame.zone_weather
+            precipitation.step(game_map, view)
+            precipitation.draw(view)
+            batch.add_runs(frame.runs.tolist(), game_map.cell_width, game_map.cell_height)
+            for (radius, color), (xs, ys) in interpolate_markers(previous, frame, alpha).items():
+                batch.add_circles(xs.tolist(), ys.tolist(), radius, color)
+            batch.flush()
+            rl.end_mode2d()
+            rl.draw_text(f"Sunlight: {frame.sunlight}", 10, 10, 20, rl.DARKGRAY)
+            rl.draw_text(f"Humidity: {frame.humidity}", 10, 40, 20, rl.DARKGRAY)
+            if frame.profile is not None:
+                for i, line in enumerate(frame.profile):
+                    rl.draw_text(line, 10, 70 + 18 * i, 16, rl.DARKGRAY)
+            if frame.graph is not None:
+                draw_graph(frame.graph, 10, SCREEN_HEIGHT - 170, 420, 160)
+            rl.end_drawing()
+            if frame.profile is not None:
+                client.post("profiler.record", "draw", time.perf_counter() - draw_started)
+            client.request_frame()
+    finally:
+        map_layer.unload()
+        precipitation.unload()
+        rl.close_window()
+        client.close()
+
+def run_replay(path):
+    # Play back an event log: Space pauses, Up/Down change speed, Left/Right seek, Home restarts
+    replay = Replay(path)
+    load_raylib()
+    rl.init_window(SCREEN_WIDTH, SCREEN_HEIGHT, b"Open World Simulation - Replay")
+    rl.set_target_fps(60)
+    game_map = replay.game_map
+    map_layer = ChunkLayer(game_map) if isinstance(game_map, ChunkedMap) else MapLayer(game_map)
+    precipitation = Precipitation()
+    batch = RenderBatch()
+    view = replay.view
+    speed, paused = 1, False
+
+    last_mouse = (rl.get_mouse_x(), rl.get_mouse_y())
     while not rl.window_should_close():
-        # Input handling to place entities
-        if rl.is_mouse_button_pressed(rl.MOUSE_BUTTON_LEFT):
-            mouse_x, mouse_y = rl.get_mouse_x(), rl.get_mouse_y()
-            cell_width = SCREEN_WIDTH // game_map.width
-            cell_height = SCREEN_HEIGHT // game_map.height
-            
-            cell_x = mouse_x // cell_width
-            cell_y = mouse_y // cell_height
-            
-            # Ensure cell_x and cell_y are within bounds
-            cell_x = min(max(cell_x, 0), game_map.width - 1)
-            cell_y = min(max(cell_y, 0), game_map.height - 1)
-            
-            # Get the zone for the clicked cell
-            zone = game_map.get_zone(cell_x, cell_y)
-            plants.append(Plant(mouse_x, mouse_y,game_map))
-
-        # Check for key presses to spawn specific animal types
-        if rl.is_key_pressed(rl.KEY_A):  # Example: 'A' key spawns an Animal
-            mouse_x, mouse_y = rl.get_mouse_x(), rl.get_mouse_y()
-            animals.append(Animal(mouse_x, mouse_y))
-        elif rl.is_key_pressed(rl.KEY_P):  # Example: 'P' key spawns a Predator
-            mouse_x, mouse_y = rl.get_mouse_x(), rl.get_mouse_y()
-            predators.append(Predator(mouse_x, mouse_y))
-        elif rl.is_key_pressed(rl.KEY_H):  # Example: 'H' key spawns a Human
-            mouse_x, mouse_y = rl.get_mouse_x(), rl.get_mouse_y()
-            humans.append(Human(mouse_x, mouse_y))
-        elif rl.is_key_pressed(rl.KEY_R):  # Example: 'R' key spawns a Rabbit
-            mouse_x, mouse_y = rl.get_mouse_x(), rl.get_mouse_y()
-            rabbits.append(Rabbit(mouse_x, mouse_y))
-        elif rl.is_key_pressed(rl.KEY_B):  # Example: 'B' key spawns a Bird
-            mouse_x, mouse_y = rl.get_mouse_x(), rl.get_mouse_y()
-            birds.append(Bird(mouse_x, mouse_y))
-        elif rl.is_key_pressed(rl.KEY_L):  # Example: 'L' key spawns a Lion
-            mouse_x, mouse_y = rl.get_mouse_x(), rl.get_mouse_y()
-            lions.append(Lion(mouse_x, mouse_y))
-        elif rl.is_key_pressed(rl.KEY_T):  # Example: 'T' key spawns a Tiger
-            mouse_x, mouse_y = rl.get_mouse_x(), rl.get_mouse_y()
-            tigers.append(Tiger(mouse_x, mouse_y))
-
-        if rl.is_key_pressed(rl.KEY_W):  # Example: 'W' key changes weather
-            weather = (weather % 3) + 1
-
-        if weather == SUNNY:
-            pass
-            '''if(sunlight<70):
-                sunlight+=30'''
-        elif weather == CLOUDY:
-            pass
-            '''if(sunlight>50):
-                sunlight-=25'''
-        elif weather == RAINY:
-            pass
-            '''if(humidity<60):
-                humidity+=12
-            if(humidity>90):
-                humidity-=4'''
-
-        # Edit parameters with keyboard input
+        mouse = (rl.get_mouse_x(), rl.get_mouse_y())
+        if pannable(game_map) and rl.is_mouse_button_down(rl.MOUSE_BUTTON_RIGHT):
+            view = (view[0] - (mouse[0] - last_mouse[0]), view[1] - (mouse[1] - last_mouse[1]), view[2], view[3])
+        last_mouse = mouse
+
+        if rl.is_key_pressed(rl.KEY_SPACE):
+            paused = not paused
         if rl.is_key_pressed(rl.KEY_UP):
-            sunlight = min(sunlight + 5, 100)
+            speed = min(speed * 2, 4096)
         elif rl.is_key_pressed(rl.KEY_DOWN):
-            sunlight = max(sunlight - 5, 0)
+            speed = max(speed // 2, 1)
+        if rl.is_key_pressed(rl.KEY_RIGHT):
+            replay.seek(replay.tick + 100 * speed)
         elif rl.is_key_pressed(rl.KEY_LEFT):
-            humidity = max(humidity - 5, 0)
-        elif rl.is_key_pressed(rl.KEY_RIGHT):
-            humidity = min(humidity + 5, 100)
-
-        # Update entities
-        for plant in plants:
-            plant.grow(sunlight, humidity,plants)
-
-        for predator in predators:
-            predator.move(animals, humans, rabbits)  # Pass predator list to move method
-            if predator.hunger <= 0:
-                predators.remove(predator)
-
-        for tiger in tigers:
-            tiger.move(animals,humans, rabbits)  # Pass tiger list to move method
-            if tiger.hunger <= 0:
-                tigers.remove(tiger)
+            replay.seek(replay.tick - 100 * speed)
+        elif rl.is_key_pressed(rl.KEY_HOME):
+            replay.seek(0)
+        if not paused:
+            replay.advance(speed)
 
-        for lion in lions:
-            lion.move(animals,humans,rabbits)  # Pass lion list to move method
-            if lion.hunger <= 0:
-                lions.remove(lion)
-
-        for human in humans:
-            human.move()
-            human.hunt(animals, predators,rabbits)
-            if human.hunger <= 0:
-                humans.remove(human)
-
-        for animal in animals:
-            animal.move()
-            animal.eat_plants(plants)  # Eat plants
-            animal.reproduce(animals)  # Reproduce
-
-            if animal.hunger <= 0:
-                animals.remove(animal)
-
-            # Animals flee from predators and humans
-            for predator in predators:
-                if animal.distance_to(predator) < 30:
-                    angle = math.atan2(animal.y - predator.y, animal.x - predator.x)
-                    animal.direction = angle
-            for human in humans:
-                if animal.distance_to(human) < 30:
-                    angle = math.atan2(animal.y - human.y, animal.x - human.x)
-                    animal.direction = angle
-
-        for rabbit in rabbits:
-            rabbit.move()
-            rabbit.eat_plants(plants)  # Eat plants
-            rabbit.reproduce(rabbits)  # Reproduce
-
-            if rabbit.hunger <= 0:
-                rabbits.remove(rabbit)
-
-            # Rabbits flee from predators and humans
-            for predator in predators:
-                if rabbit.distance_to(predator) < 30:
-                    angle = math.atan2(rabbit.y - predator.y, rabbit.x - predator.x)
-                    rabbit.direction = angle
-            for human in humans:
-                if rabbit.distance_to(human) < 30:
-                    angle = math.atan2(rabbit.y - human.y, rabbit.x - human.x)
-                    rabbit.direction = angle
-
-        for bird in birds:
-            bird.move(humans, predators)
-            bird.eat_plants(plants)  # Eat plants
-            bird.reproduce(birds)  # Reproduce
-
-            if bird.hunger <= 0:
-                birds.remove(bird)
-
-
-        if weather == RAINY:
-            for raindrop in raindrops:
-                raindrop.move()
-
-        # Draw entities
         rl.begin_drawing()
-        draw_map(game_map)
-
-        if weather == RAINY:
-            for raindrop in raindrops:
-                raindrop.draw()
-
-        for plant in plants:
-            plant.draw()
-
-        for animal in animals:
-            animal.draw()
-
-        for predator in predators:
-            predator.draw()
-
-        for human in humans:
-            human.draw()
-
-        for rabbit in rabbits:
-            rabbit.draw()
-
-        for bird in birds:
-            bird.draw()
-
-        for tiger in tigers:
-            tiger.draw()
-        
-        for lion in lions:
-            lion.draw()
-
-        # Draw parameters
-        rl.draw_text(f"Sunlight: {sunlight}", 10, 10, 20, rl.DARKGRAY)
-        rl.draw_text(f"Humidity: {humidity}", 10, 40, 20, rl.DARKGRAY)  
+        camera = rl.Camera2D(rl.Vector2(0, 0), rl.Vector2(view[0], view[1]), 0.0, 1.0)
+        rl.begin_mode2d(camera)
+        map_layer.draw(view)
+        precipitation.zone_weather[:len(replay.precipitation)] = replay.precipitation
+        precipitation.step(game_map, view)
+        precipitation.draw(view)
+        if replay.vegetation:
+            xs, ys = zip(*replay.vegetation)
+            batch.add_cells(xs, ys, game_map.cell_width, game_map.cell_height)
+        for (kind, color), (xs, ys) in replay.positions().items():
+            batch.add_circles(xs, ys, kind.MARKER_RADIUS, color)
+        batch.flush()
+        rl.end_mode2d()
+        rl.draw_text(f"Tick {replay.tick} / {replay.last_tick}  x{speed}{'  paused' if paused else ''}",
+                     10, 10, 20, rl.DARKGRAY)
+        rl.draw_text(f"Sunlight: {replay.sunlight:g}  Humidity: {replay.humidity:g}", 10, 40, 20, rl.DARKGRAY)
+        if replay.last_input is not None:
+            tick, label, _, _ = replay.last_input
+            rl.draw_text(f"Input at tick {tick}: {label}", 10, 70, 20, rl.DARKGRAY)
         rl.end_drawing()
 
+    map_layer.unload()
+    precipitation.unload()
     rl.close_window()
 
+def memory_report(sim):
+    # Bytes per species for capacity planning: the entity objects themselves (with the column
+    # dict of any detached animal), their bookkeeping in the EntityList, the registry and their
+    # id ints, and their EntityStore columns including rows held in reserve. The vegetation
+    # raster is a fixed cost of the window rather than of the plants, so it gets its own line.
+    registry = sim.registry.entities
+    registry_share = sys.getsizeof(registry) / max(len(registry), 1)
+    report = {}
+    for kind, group in sim.populations.items():
+        count = len(group)
+        objects = sum(sys.getsizeof(entity) for entity in group)
+        if kind is not Plant:
+            objects += sum(sys.getsizeof(entity._detached) for entity in group if entity._detached is not None)
+        bookkeeping = (sys.getsizeof(group.entities) + registry_share * count
+                       + sum(sys.getsizeof(entity.id) for entity in group))
+        columns = 0
+        if isinstance(group, EntityStore):
+            columns = sum(column.nbytes for column in group.columns.values()) + group.lag.nbytes
+        total = objects + bookkeeping + columns
+        report[kind.__name__] = {"count": count, "object_bytes": objects, "bookkeeping_bytes": round(bookkeeping),
+                                 "column_bytes": columns, "total_bytes": round(total),
+                                 "bytes_per_entity": total / count if count else 0.0}
+    vegetation = sim.vegetation
+    raster = vegetation.biomass.nbytes + vegetation.owner.nbytes
+    report["Vegetation"] = {"count": vegetation.owner.size, "object_bytes": 0, "bookkeeping_bytes": 0,
+                            "column_bytes": raster, "total_bytes": raster,
+                            "bytes_per_entity": raster / vegetation.owner.size if vegetation.owner.size else 0.0}
+    return report
+
+def format_memory_report(report):
+    lines = [f"{'':>10} {'count':>9} {'B/each':>8} {'objects':>9} {'index':>9} {'columns':>9} {'total':>9}"]
+    for name, row in report.items():
+        lines.append(f"{name:>10} {row['count']:9d} {row['bytes_per_entity']:8.1f} "
+                     + " ".join(f"{row[key] / 2 ** 20:7.2f}MB"
+                                for key in ("object_bytes", "bookkeeping_bytes", "column_bytes", "total_bytes")))
+    total = sum(row["total_bytes"] for row in report.values())
+    lines.append(f"{'total':>10} {'':>9} {'':>8} {'':>9} {'':>9} {'':>9} {total / 2 ** 20:7.2f}MB")
+    return "\n".join(lines)
+
+def run_headless(sim, ticks, profile_path=None):
+    # Step as fast as the CPU allows and report the surviving populations
+    sim.profiler.enabled = profile_path is not None
+    sim.step(ticks)
+    print(f"tick {sim.tick}: " + ", ".join(f"{name}={count}" for name, count in sim.counts().items()))
+    if profile_path:
+        sim.profiler.export(profile_path)
+
+# Scripted population for benchmarks, scaled by --bench-scale
+BENCHMARK_POPULATION = {Plant: 2000, Rabbit: 10000, Predator: 200, Tiger: 150, Lion: 150, Human: 200, Bird: 1000}
+BENCHMARK_SCHEMA = 3  # Bump when the result layout changes
+
+def run_benchmark(ticks=20, seed=1234, scale=1.0, warmup=2, lod=False):
+    # Time every update phase over a seeded, scripted world and return the results as a dict
+    results = {
+        "schema": BENCHMARK_SCHEMA,
+        "seed": seed,
+        "ticks": ticks,
+        "scale": scale,
+        "lod": lod,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+    }
+
+    # Map generation, timed separately since it only runs at startup
+    map_generation = {}
+    for size in (100, 500, 1000):
+        timings = [Map(size, size, 1, seed=seed + repeat).generation_time for repeat in range(3)]
+        map_generation[f"{size}x{size}"] = {"best_s": min(timings), "mean_s": sum(timings) / len(timings)}
+    results["map_generation"] = map_generation
+
+    sim = Simulation(seed=seed, lod=lod)
+    population = {kind: int(count * scale) for kind, count in BENCHMARK_POPULATION.items()}
+    sim.populate(population)
+    sim.weather = RAINY  # So the weather phase has work to do
+    results["population"] = {kind.__name__: count for kind, count in population.items()}
+    sim.step(warmup)
+
+    samples = {name: [] for name, _ in sim.phases}
+    totals = []
+    for _ in range(ticks):
+        tick_started = time.perf_counter()
+        for name, phase in sim.phases:
+            started = time.perf_counter()
+            phase()
+            samples[name].append(time.perf_counter() - started)
+        totals.append(time.perf_counter() - tick_started)
+
+    def summary(values):
+        ordered = sorted(values)
+        mean = sum(values) / len(values)
+        return {
+            "total_s": sum(values),
+            "mean_ms": mean * 1000,
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "max_ms": ordered[-1] * 1000,
+            "ticks_per_s": 1 / mean if mean else None,
+        }
+
+    results["phases"] = {name: summary(values) for name, values in samples.items()}
+    results["tick"] = summary(totals)
+    results["final_counts"] = sim.counts()
+    results["memory"] = memory_report(sim)
+    return results
+
+def compare_benchmarks(baseline, results):
+    # Per-phase mean tick time of a run against an earlier results file, slower phases show > 1.00x
+    lines = []
+    for name, current in list(results["phases"].items()) + [("tick", results["tick"])]:
+        before = baseline["phases"].get(name) if name != "tick" else baseline.get("tick")
+        if before and before["mean_ms"]:
+            ratio = current["mean_ms"] / before["mean_ms"]
+            lines.append(f"{name:>12}: {before['mean_ms']:9.3f} ms -> {current['mean_ms']:9.3f} ms ({ratio:.2f}x)")
+    return "\n".join(lines)
+
+# Knobs a world can override for itself (Simulation(tunables=...), Simulation.tune), as the
+# kind and the attribute holding the value: the Vegetation's for plants, otherwise the kind's
+# EntityList's. Each starts at the class constant, so the classes themselves never change.
+TUNABLES = {
+    "growth_rate": (Plant, "growth_rate"),
+    "predator_hunt_hunger": (Predator, "hunt_hunger"),
+    "lion_hunt_hunger": (Lion, "hunt_hunger"),
+    "tiger_hunt_hunger": (Tiger, "hunt_hunger"),
+    "human_hunt_hunger": (Human, "hunt_hunger"),
+}
+SWEEP_POPULATIONS = {f"{kind.__name__.lower()}s": kind for kind in ENTITY_KINDS.values()}  # As the CLI flags
+SWEEP_PARAMETERS = ("sunlight", "humidity") + tuple(TUNABLES) + tuple(SWEEP_POPULATIONS)
+
+def sweep_runs(spec):
+    # The runs a sweep spec asks for, as one parameter dict each. "grid" maps parameters to the
+    # values to try in every combination; "sample" draws "count" random points from the
+    # [low, high] "ranges" for each grid point (reproducibly, from "sample_seed"); "base" holds
+    # the parameters every run shares; "seeds" is a count or a list, and every point runs once
+    # per seed. The seed comes only from "seeds", never from the swept parameters.
+    if not isinstance(spec, dict):
+        raise ValueError("a sweep spec is a JSON object")
+    grid = spec.get("grid", {})
+    sample = spec.get("sample", {})
+    names = set(spec.get("base", {})) | set(grid) | set(sample.get("ranges", {}))
+    if "seed" in names:
+        raise ValueError('sweep runs take their seeds from "seeds", not a "seed" parameter')
+    unknown = names - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"unknown sweep parameters: {', '.join(sorted(unknown))}")
+    seeds = spec.get("seeds", 1)
+    seeds = list(range(seeds)) if isinstance(seeds, int) else list(seeds)
+    generator = RngService(spec.get("sample_seed", 0)).stream("sweep").generator
+
+    points = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    if sample:
+        sampled = []
+        for point in points:
+            for _ in range(sample.get("count", 1)):
+                drawn = dict(point)
+                for name, (low, high) in sample["ranges"].items():
+                    value = generator.uniform(low, high)
+                    drawn[name] = round(value) if name in SWEEP_POPULATIONS else value
+                sampled.append(drawn)
+        points = sampled
+    runs = [dict(spec.get("base", {}), **point, seed=seed) for point in points for seed in seeds]
+    for run in runs:
+        for name, value in run.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"sweep parameter {name} must be a number, not {value!r}")
+    if not isinstance(spec.get("ticks", 0), int):
+        raise ValueError('"ticks" must be a whole number')
+    return runs
+
+def run_experiment(params, ticks):
+    # One sweep run, in a pool worker: a headless world set up from params and stepped for
+    # ticks, reduced to its outcome - peak and final count and extinction tick per species,
+    # and the share of the map that is green
+    started = time.perf_counter()
+    sim = Simulation(seed=params["seed"], tunables={name: params[name] for name in TUNABLES if name in params})
+    sim.sunlight = params.get("sunlight", sim.sunlight)
+    sim.humidity = params.get("humidity", sim.humidity)
+    sim.populate({kind: int(params.get(name, 0)) for name, kind in SWEEP_POPULATIONS.items()})
+
+    peak = {kind.__name__: len(group) for kind, group in sim.populations.items()}
+    extinction = {name: None for name in peak}
+    coverage = []
+    for _ in range(ticks):
+        sim.update()
+        for kind, group in sim.populations.items():
+            name = kind.__name__
+            if len(group) > peak[name]:
+                peak[name] = len(group)
+            elif not len(group) and peak[name] and extinction[name] is None:
+                extinction[name] = sim.tick
+        coverage.append(np.count_nonzero(sim.vegetation.owner) / sim.vegetation.owner.size)
+    return {
+        "params": params,
+        "ticks": ticks,
+        "seconds": time.perf_counter() - started,
+        "peak": peak,
+        "final": sim.counts(),
+        "extinction": extinction,  # Tick each species died out, None while it lives (or never lived)
+        "coverage": {"final": coverage[-1] if coverage else 0.0, "mean": float(np.mean(coverage)) if coverage else 0.0,
+                     "peak": max(coverage, default=0.0)},
+    }
+
+def run_sweep(runs, ticks, workers=None, out=sys.stdout):
+    # Run every parameter dict in a process pool and write each result to out as a JSON line
+    # as soon as it finishes, in whatever order they finish; returns all the results
+    results = []
+    with ProcessPoolExecutor(workers or None) as pool:
+        futures = {pool.submit(run_experiment, params, ticks): index for index, params in enumerate(runs)}
+        for future in as_completed(futures):
+            result = dict(future.result(), run=futures[future])
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            results.append(result)
+    return results
+
+def aggregate_sweep(results):
+    # One row per parameter point with the outcomes averaged over its seeds: mean peak count,
+    # the share of runs a species died out in and the mean tick it did, and plant coverage
+    points = {}
+    for result in results:
+        params = {name: value for name, value in result["params"].items() if name != "seed"}
+        points.setdefault(json.dumps(params, sort_keys=True), (params, []))[1].append(result)
+    rows = []
+    for params, runs in points.values():
+        species = {}
+        for name in runs[0]["peak"]:
+            if not any(run["peak"][name] for run in runs):
+                continue
+            extinct = [run["extinction"][name] for run in runs if run["extinction"][name] is not None]
+            species[name] = {
+                "peak_mean": sum(run["peak"][name] for run in runs) / len(runs),
+                "extinct_share": len(extinct) / len(runs),
+                "extinction_mean": sum(extinct) / len(extinct) if extinct else None,
+            }
+        rows.append({
+            "params": params,
+            "runs": len(runs),
+            "species": species,
+            "coverage_mean": sum(run["coverage"]["mean"] for run in runs) / len(runs),
+            "coverage_final": sum(run["coverage"]["final"] for run in runs) / len(runs),
+        })
+    return rows
+
+def format_sweep(rows):
+    lines = []
+    for row in rows:
+        params = " ".join(f"{name}={value:g}" for name, value in sorted(row["params"].items()))
+        species = "  ".join(f"{name} peak {outcome['peak_mean']:.0f} extinct {outcome['extinct_share']:.0%}"
+                            + (f" @{outcome['extinction_mean']:.0f}" if outcome["extinction_mean"] is not None else "")
+                            for name, outcome in row["species"].items())
+        lines.append(f"{params} | runs {row['runs']} | coverage {row['coverage_mean']:.1%} "
+                     f"(final {row['coverage_final']:.1%}) | {species}")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Open World Simulation")
+    parser.add_argument("--headless", action="store_true", help="run without a window")
+    parser.add_argument("--ticks", type=int, default=1000, help="ticks to simulate in headless mode")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random number generator")
+    parser.add_argument("--map-size", type=int, nargs=2, default=(100, 100), metavar=("W", "H"),
+                        help="zone map size in cells")
+    parser.add_argument("--chunked", action="store_true",
+                        help="unbounded world generated chunk by chunk around the view")
+    parser.add_argument("--chunk-memory", type=int, default=CHUNK_MEMORY_CAP // (1024 * 1024), metavar="MB",
+                        help="memory cap for generated zone chunks")
+    parser.add_argument("--archive-dir", default=None, help="where inactive chunks are parked")
+    parser.add_argument("--profile", default=None, metavar="FILE",
+                        help="headless: record per-phase tick timings and export them (.json or .csv)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="with --sweep, the number of runs in parallel (default: one per core)")
+    parser.add_argument("--record", default=None, metavar="FILE", help="append the run's events to an event log")
+    parser.add_argument("--record-keyframes", type=int, default=EVENT_KEYFRAME_INTERVAL, metavar="TICKS",
+                        help="ticks between full-position keyframes in the event log")
+    parser.add_argument("--stats", default=None, metavar="FILE",
+                        help="stream per-tick population statistics to a columnar file")
+    parser.add_argument("--replay", default=None, metavar="FILE", help="play back an event log")
+    parser.add_argument("--lod", action="store_true",
+                        help="update idle and off-screen entities at reduced rates")
+    parser.add_argument("--sim-rate", type=float, default=60, metavar="TICKS",
+                        help="ticks per second the interactive simulation aims for (0 = as fast as it can)")
+    parser.add_argument("--particles", type=int, default=PARTICLE_COUNT,
+                        help="rain and snow particles kept over the view")
+    parser.add_argument("--load", default=None, metavar="FILE", help="resume from a snapshot file")
+    parser.add_argument("--save", default=None, metavar="FILE", help="headless: write a snapshot when done")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="headless: print the bytes per entity and per species when done")
+    parser.add_argument("--checkpoint", default=None, metavar="FILE",
+                        help="write a snapshot in the background every --checkpoint-every ticks "
+                             "({tick} in the name keeps each one)")
+    parser.add_argument("--checkpoint-every", type=int, default=500, metavar="TICKS",
+                        help="ticks between checkpoints")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time each update phase on a scripted world and write JSON results")
+    parser.add_argument("--sweep", default=None, metavar="SPEC",
+                        help="run the parameter sweep in a JSON spec file, --ticks ticks per run")
+    parser.add_argument("--sweep-out", default=None, metavar="FILE",
+                        help="sweep results as JSON lines, written as runs finish (default: stdout)")
+    parser.add_argument("--bench-scale", type=float, default=1.0, help="multiplier for the benchmark population")
+    parser.add_argument("--bench-out", default=None, help="benchmark results file (default: stdout)")
+    parser.add_argument("--bench-baseline", default=None, help="earlier results file to compare against")
+    for kind in (Plant, Animal, Predator, Tiger, Lion, Human, Rabbit, Bird):
+        name = kind.__name__.lower()
+        parser.add_argument(f"--{name}s", type=int, default=0, dest=name,
+                            help=f"initial number of {name}s to scatter")
+    args = parser.parse_args(argv)
+    if min(args.map_size) < 1:
+        parser.error("--map-size needs at least one cell each way")
+    if args.sweep:
+        # Load and expand the spec here so a bad one is a usage error, not a traceback
+        try:
+            with open(args.sweep) as spec_file:
+                args.sweep_spec = json.load(spec_file)
+            args.sweep_runs = sweep_runs(args.sweep_spec)
+        except (OSError, ValueError, TypeError, KeyError, AttributeError) as error:
+            parser.error(f"--sweep {args.sweep}: {error}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.benchmark:
+        results = run_benchmark(ticks=args.ticks, seed=1234 if args.seed is None else args.seed,
+                                scale=args.bench_scale, lod=args.lod)
+        if args.bench_out:
+            with open(args.bench_out, "w") as out:
+                json.dump(results, out, indent=2)
+        else:
+            print(json.dumps(results, indent=2))
+        if args.bench_baseline:
+            with open(args.bench_baseline) as baseline:
+                print(compare_benchmarks(json.load(baseline), results), file=sys.stderr)
+        return
+    if args.sweep:
+        out = open(args.sweep_out, "w") if args.sweep_out else sys.stdout
+        try:
+            results = run_sweep(args.sweep_runs, args.sweep_spec.get("ticks", args.ticks), args.workers, out)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(format_sweep(aggregate_sweep(results)), file=sys.stderr)
+        return
+    if args.replay:
+        run_replay(args.replay)
+        return
+
+    if not args.headless:
+        run_interactive(args)
+        return
+
+    sim = build_simulation(args)
+    run_headless(sim, args.ticks, args.profile)
+    if args.memory_report:
+        print(format_memory_report(memory_report(sim)))
+    if args.save:
+        sim.save(args.save)
+    close_simulation(sim)
+
 if __name__ == "__main__":
     main()